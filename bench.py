@@ -0,0 +1,90 @@
+import time
+
+START = time.perf_counter()
+
+import argparse
+import json
+import sys
+
+import main
+import profiler
+import replay
+from profiler import CountingSurface
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+    return {"p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99), "max": ordered[-1] * 1000}
+
+
+def run(steps, runs):
+    main.init(headless=True)
+    update_times, draw_times, surfaces = [], [], []
+    first_frame = None
+    wins = 0
+    profiler.install_surface_counter()
+    try:
+        for _ in range(runs):
+            game = main.new_game(seed=0)
+
+            def frame():
+                nonlocal first_frame
+                created = CountingSurface.created
+                t0 = time.perf_counter()
+                main.tick(game)
+                t1 = time.perf_counter()
+                game.player.interpolate(1.0)
+                main.render(game, main.screen)
+                t2 = time.perf_counter()
+                if first_frame is None:
+                    first_frame = t2 - START
+                update_times.append(t1 - t0)
+                draw_times.append(t2 - t1)
+                surfaces.append(CountingSurface.created - created)
+
+            replay.run_script(game, steps, frame)
+            wins += game.win
+    finally:
+        profiler.uninstall_surface_counter()
+    return {
+        "runs": runs,
+        "frames": len(draw_times),
+        "wins": wins,
+        "time_to_first_frame_ms": first_frame * 1000,
+        "update_ms": percentiles(update_times),
+        "draw_ms": percentiles(draw_times),
+        "surfaces_per_frame": sum(surfaces) / len(surfaces),
+        "surfaces_per_frame_max": max(surfaces),
+    }
+
+
+def report(result):
+    print(f"{result['runs']} 次通關腳本，共 {result['frames']} 幀，通關 {result['wins']} 次")
+    print(f"第一幀：{result['time_to_first_frame_ms']:.1f} ms")
+    for name in ("update_ms", "draw_ms"):
+        p = result[name]
+        print(f"{name[:-3]:>7}: p50 {p['p50']:.3f}  p95 {p['p95']:.3f}  p99 {p['p99']:.3f}  max {p['max']:.3f} ms")
+    print(f"每幀新建 Surface：平均 {result['surfaces_per_frame']:.2f}，最多 {result['surfaces_per_frame_max']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="headless 跑通關腳本並量測每幀的時間")
+    parser.add_argument("script", nargs="?", default="playthroughs/default.json")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--json", help="把結果寫成 JSON 檔")
+    parser.add_argument("--max-draw-p95", type=float, help="draw p95 超過這個毫秒數就回傳失敗")
+    parser.add_argument("--max-surfaces", type=float, help="平均每幀新建 Surface 超過這個數就回傳失敗")
+    args = parser.parse_args()
+
+    result = run(replay.load_script(args.script), args.runs)
+    report(result)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+    failed = result["wins"] != args.runs
+    if args.max_draw_p95 is not None and result["draw_ms"]["p95"] > args.max_draw_p95:
+        failed = True
+    if args.max_surfaces is not None and result["surfaces_per_frame"] > args.max_surfaces:
+        failed = True
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,34 @@
+import pygame
+
+
+class Camera:
+    # 畫面看得到的房間範圍（世界座標）。房間比畫面大時跟著人物捲動，
+    # 不會超出房間的邊界；房間和畫面一樣大時永遠停在 (0, 0)
+    def __init__(self, view_size, world_size=None):
+        self.rect = pygame.Rect((0, 0), view_size)
+        self.world = pygame.Rect((0, 0), world_size or view_size)
+
+    # 世界座標加上 offset 就是畫面座標
+    @property
+    def offset(self) -> tuple:
+        return (-self.rect.x, -self.rect.y)
+
+    def set_world(self, size):
+        self.world = pygame.Rect((0, 0), size)
+        self.rect.clamp_ip(self.world)
+
+    # 讓 pos 盡量在畫面中間；回傳畫面有沒有移動
+    def follow(self, pos) -> bool:
+        old = self.rect.topleft
+        self.rect.center = (round(pos[0]), round(pos[1]))
+        self.rect.clamp_ip(self.world)
+        return self.rect.topleft != old
+
+    def to_world(self, pos) -> tuple:
+        return (pos[0] + self.rect.x, pos[1] + self.rect.y)
+
+    def to_screen(self, pos) -> tuple:
+        return (pos[0] - self.rect.x, pos[1] - self.rect.y)
+
+    def to_screen_rect(self, rect) -> pygame.Rect:
+        return pygame.Rect(rect).move(-self.rect.x, -self.rect.y)
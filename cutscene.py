@@ -0,0 +1,99 @@
+import pygame
+
+import profiler
+
+# 睜眼的時間軸：每一段 (秒數, 起始高度, 結束高度)，高度是畫面高度的比例
+EYE_TIMELINE = [(1 / 1.2, 0.1, 0.6), (1 / 1.2, 0.6, 0.1), (1 / 1.2, 0.1, 0.6)]
+# 眼皮的開合分成幾階，每一階的遮罩第一次用到時畫好後快取，所有開場共用
+EYE_STEPS = 24
+EYE_WIDTH = 0.9
+BACKGROUND = (35, 38, 48)
+WALL = (60, 65, 80)
+HOLE = (255, 0, 255)
+_eyelids: dict[tuple, pygame.Surface] = {}
+
+
+def eyelid(size, step) -> pygame.Surface:
+    # 只有橢圓外框那一塊：黑色，橢圓的部分是 colorkey（透明）；8 位元的圖，省記憶體
+    key = (tuple(size), step)
+    mask = _eyelids.get(key)
+    if mask is None:
+        lo = min(h for _, a, b in EYE_TIMELINE for h in (a, b))
+        hi = max(h for _, a, b in EYE_TIMELINE for h in (a, b))
+        w = round(size[0] * EYE_WIDTH)
+        h = round(size[1] * (lo + (hi - lo) * step / EYE_STEPS))
+        mask = pygame.Surface((w, h), 0, 8)
+        mask.set_palette_at(0, (0, 0, 0))
+        mask.set_palette_at(1, HOLE)
+        mask.fill(0)
+        pygame.draw.ellipse(mask, 1, mask.get_rect())
+        mask.set_colorkey(HOLE)
+        _eyelids[key] = mask
+    return mask
+
+
+class EyeIntro:
+    # 開場動畫：依時間軸睜眼、閉眼、再睜眼，同時逐字顯示開場白。
+    # 每個 tick 呼叫 update（和遊戲共用同一個時鐘），done 之後 Game 就把它拿掉
+    def __init__(self, size, messages, typewriter, tick_rate=60, type_speed=2):
+        self.size = size
+        self.messages = messages
+        self.typewriter = typewriter
+        self.tick_rate = tick_rate
+        self.type_speed = type_speed
+        self.ticks = 0
+        self.duration = round(sum(seconds for seconds, _, _ in EYE_TIMELINE) * tick_rate)
+        self.line = 0
+        self.typed = ""
+        self.step = self.eye_step()
+        self.done = False
+        # 畫面有沒有變（眼皮換了一階或多了一個字），沒變就不必重畫
+        self.changed = True
+
+    def eye_step(self) -> int:
+        t = self.ticks / self.tick_rate
+        lo = min(h for _, a, b in EYE_TIMELINE for h in (a, b))
+        hi = max(h for _, a, b in EYE_TIMELINE for h in (a, b))
+        for seconds, start, end in EYE_TIMELINE:
+            if t < seconds:
+                h = start + (end - start) * t / seconds
+                return round((h - lo) / (hi - lo) * EYE_STEPS)
+            t -= seconds
+        return round((EYE_TIMELINE[-1][2] - lo) / (hi - lo) * EYE_STEPS)
+
+    def update(self):
+        self.ticks += 1
+        if self.ticks >= self.duration:
+            self.skip()
+            return
+        step = self.eye_step()
+        if step != self.step:
+            self.step = step
+            self.changed = True
+        if self.line < len(self.messages):
+            text = self.messages[self.line]
+            if len(self.typed) < len(text):
+                if self.ticks % self.type_speed == 0:
+                    self.typed += text[len(self.typed)]
+                    self.changed = True
+            else:
+                self.line += 1
+                self.typed = ""
+                self.changed = True
+
+    def skip(self):
+        self.done = True
+        self.changed = True
+
+    def draw(self, surf):
+        w, h = self.size
+        mask = eyelid(self.size, self.step)
+        hole = mask.get_rect(center=(w // 2, h // 2))
+        surf.fill((0, 0, 0))
+        surf.fill(BACKGROUND, hole)
+        surf.fill(WALL, hole.clip((0, 0, w, h - 120)))
+        surf.blit(mask, hole)
+        self.typewriter.set_text(self.typed)
+        self.typewriter.draw(surf, (w // 2, h - 80), center=True)
+        profiler.count("blits", 2)
+        self.changed = False
@@ -0,0 +1,48 @@
+import pygame
+
+
+class DirtyRects:
+    # 收集這一幀需要重畫的區域，交給 display.update 只更新這些範圍
+    def __init__(self, bounds):
+        self.bounds = pygame.Rect(bounds)
+        self.rects: list[pygame.Rect] = []
+        self.full = True
+
+    def add(self, rect):
+        if rect is None or self.full:
+            return
+        rect = pygame.Rect(rect).clip(self.bounds)
+        if rect.width and rect.height:
+            self.rects.append(rect)
+
+    def add_full(self):
+        self.full = True
+        self.rects.clear()
+
+    def __bool__(self):
+        return self.full or bool(self.rects)
+
+    def take(self) -> list[pygame.Rect]:
+        if self.full:
+            rects = [self.bounds.copy()]
+        else:
+            rects = self._merge(self.rects)
+        self.rects = []
+        self.full = False
+        return rects
+
+    @staticmethod
+    def _merge(rects):
+        # 重疊的區域合併，避免同一塊被重畫、上傳兩次
+        merged: list[pygame.Rect] = []
+        for r in rects:
+            r = r.copy()
+            i = 0
+            while i < len(merged):
+                if merged[i].colliderect(r):
+                    r.union_ip(merged.pop(i))
+                    i = 0
+                else:
+                    i += 1
+            merged.append(r)
+        return merged
@@ -0,0 +1,30 @@
+import pygame
+
+import profiler
+
+
+class Layer:
+    # 靜態圖層：第一次畫的時候烘焙成一張圖，之後每幀只要貼一次，
+    # 內容有變動時呼叫 invalidate，下次畫的時候再重新烘焙
+    def __init__(self, rect, bake, flags=0):
+        self.rect = pygame.Rect(rect)
+        self.bake = bake
+        self.flags = flags
+        self.surface: pygame.Surface | None = None
+        self.valid = False
+
+    def invalidate(self):
+        self.valid = False
+
+    def release(self):
+        self.surface = None
+        self.valid = False
+
+    def draw(self, surf):
+        if not self.valid:
+            if self.surface is None:
+                self.surface = pygame.Surface(self.rect.size, self.flags)
+            self.bake(self.surface)
+            self.valid = True
+        surf.blit(self.surface, self.rect.topleft)
+        profiler.count("blits")
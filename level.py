@@ -0,0 +1,97 @@
+import json
+import math
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from recipes import RecipeBook
+from rules import RuleTable
+
+
+class Level:
+    # 關卡檔：房間先只保留原始定義，要進入（或預先載入）時才建立物件
+    def __init__(self, path):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        self.path = path
+        self.start_room = data["start_room"]
+        self.items: dict[str, dict] = data["items"]
+        self.rules = RuleTable(data["rules"])
+        self.recipes = RecipeBook(data.get("recipes", []))
+        unknown = self.recipes.items() - self.items.keys()
+        if unknown:
+            raise ValueError(f"組合裡有未定義的物品：{sorted(unknown)}")
+        self.rooms: dict[int, dict] = {room["id"]: room for room in data["rooms"]}
+
+    def exits(self, room_id):
+        return self.rooms[room_id].get("exits", [])
+
+    def distances(self, start):
+        # 從 start 出發，沿著出口走到每個房間要經過幾道門
+        dist = {start: 0}
+        queue = deque([start])
+        while queue:
+            room_id = queue.popleft()
+            for nxt in self.exits(room_id):
+                if nxt not in dist:
+                    dist[nxt] = dist[room_id] + 1
+                    queue.append(nxt)
+        return dist
+
+
+# 所有 RoomCache 共用一個背景執行緒，同一個行程開很多局也只多一條執行緒
+_executor: ThreadPoolExecutor | None = None
+
+
+def _loader() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="room-loader")
+    return _executor
+
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
+
+
+class RoomCache:
+    # 已載入的房間。背景執行緒預先載入相鄰的房間（prefetch=False 時不預載，用到才在呼叫端建立）；
+    # 超過記憶體預算時，先淘汰離目前房間最遠的
+    def __init__(self, level: Level, build, size, budget, prefetch=True):
+        self.level = level
+        self.build = build
+        self.size = size
+        self.budget = budget
+        self.prefetching = prefetch
+        self.rooms: dict[int, dict] = {}
+        self.pending: dict[int, Future] = {}
+
+    def get(self, room_id) -> dict:
+        room = self.rooms.get(room_id)
+        if room is None:
+            future = self.pending.pop(room_id, None)
+            room = future.result() if future else self.build(room_id)
+            self.rooms[room_id] = room
+        return room
+
+    def prefetch(self, room_ids):
+        if not self.prefetching:
+            return
+        for room_id in room_ids:
+            if room_id in self.rooms or room_id in self.pending:
+                continue
+            self.pending[room_id] = _loader().submit(self.build, room_id)
+
+    # 不再使用時取消還沒開始的預載
+    def close(self):
+        for future in self.pending.values():
+            future.cancel()
+        self.pending.clear()
+
+    def evict(self, current, on_evict):
+        dist = self.level.distances(current)
+        while len(self.rooms) > 1 and sum(self.size(room) for room in self.rooms.values()) > self.budget:
+            far = max((r for r in self.rooms if r != current), key=lambda r: dist.get(r, math.inf))
+            on_evict(far, self.rooms.pop(far))
@@ -0,0 +1,109 @@
+import math
+from dataclasses import dataclass
+
+import pygame
+
+import profiler
+
+# numpy 是選用的；沒有裝時 available 為 False，遊戲改用 surfaces.Spotlight
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+available = np is not None
+# 光圈貼圖先用 numpy 在 1/4 解析度算，放大後快取，同半徑同顏色的光共用
+FALLOFF_SCALE = 4
+# 閃爍的亮度分成幾階，每一階的貼圖第一次用到時建立後快取
+FLICKER_LEVELS = 8
+_falloff: dict[tuple, pygame.Surface] = {}
+
+
+@dataclass(eq=False)
+class Light:
+    pos: tuple
+    radius: int
+    color: tuple = (200, 200, 200)
+    # 0 是穩定的光，越大閃得越厲害（蠟燭約 0.3）
+    flicker: float = 0.0
+    phase: float = 0.0
+
+    @property
+    def rect(self) -> pygame.Rect:
+        r = self.radius
+        return pygame.Rect(round(self.pos[0]) - r, round(self.pos[1]) - r, r * 2, r * 2)
+
+    # t 秒時的亮度比例；用 tick 算，重播時每次都一樣
+    def level(self, t) -> float:
+        if not self.flicker:
+            return 1.0
+        wave = 0.5 + 0.3 * math.sin(t * 11.0 + self.phase) + 0.2 * math.sin(t * 23.7 + self.phase * 2.3)
+        return 1.0 - self.flicker * wave
+
+
+def falloff_texture(radius, color, level=FLICKER_LEVELS) -> pygame.Surface:
+    key = (radius, tuple(color), level)
+    tex = _falloff.get(key)
+    if tex is not None:
+        return tex
+    if level < FLICKER_LEVELS:
+        tex = falloff_texture(radius, color).copy()
+        v = 255 * level // FLICKER_LEVELS
+        tex.fill((v, v, v), special_flags=pygame.BLEND_MULT)
+        _falloff[key] = tex
+        return tex
+    n = max(2, radius * 2 // FALLOFF_SCALE)
+    axis = (np.arange(n, dtype=np.float32) + 0.5) / n * 2 - 1
+    d = np.minimum(np.hypot(axis[:, None], axis[None, :]), 1.0)
+    # smoothstep：中心最亮，邊緣平滑地降到 0，沒有硬邊
+    f = 1.0 - d
+    f = f * f * (3 - 2 * f)
+    rgb = (f[:, :, None] * np.array(color, dtype=np.float32)).astype(np.uint8)
+    tex = pygame.Surface((radius * 2, radius * 2))
+    pygame.transform.smoothscale(pygame.surfarray.make_surface(rgb), tex.get_size(), tex)
+    _falloff[key] = tex
+    return tex
+
+
+class LightMap:
+    # 光照圖：底色是環境光，每個光源把快取的光圈貼圖加上去（BLEND_ADD），
+    # 最後整張用一次 BLEND_MULT 乘到畫面上。只處理畫面目前的 clip 區域
+    def __init__(self, size, ambient=(55, 55, 55)):
+        self.size = size
+        self.ambient = ambient
+        self.surface: pygame.Surface | None = None
+        # 上一幀每個光源畫在哪裡，用來回報需要重畫的區域
+        self.drawn: dict[Light, pygame.Rect] = {}
+
+    # offset：光源的世界座標換成畫面座標要加的位移
+    def dirty(self, lights, offset=(0, 0)) -> list[pygame.Rect]:
+        rects = []
+        drawn = {}
+        for light in lights:
+            rect = light.rect.move(offset)
+            old = self.drawn.get(light)
+            if light.flicker or rect != old:
+                rects.append(rect)
+                if old:
+                    rects.append(old)
+            drawn[light] = rect
+        self.drawn = drawn
+        return rects
+
+    def draw(self, surf, lights, t, offset=(0, 0)):
+        if self.surface is None:
+            self.surface = pygame.Surface(self.size)
+        clip = surf.get_clip()
+        light_map = self.surface
+        light_map.set_clip(clip)
+        light_map.fill(self.ambient)
+        for light in lights:
+            rect = light.rect.move(offset)
+            if not rect.colliderect(clip):
+                continue
+            level = max(0, min(FLICKER_LEVELS, round(light.level(t) * FLICKER_LEVELS)))
+            tex = falloff_texture(light.radius, light.color, level)
+            light_map.blit(tex, rect, special_flags=pygame.BLEND_ADD)
+        light_map.set_clip(None)
+        surf.blit(light_map, clip, clip, special_flags=pygame.BLEND_MULT)
+        profiler.count("blits", len(lights) + 1)
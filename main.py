@@ -1,16 +1,53 @@
 import pygame
+import os
+import random
 import sys
 from player import Player
+from cutscene import EyeIntro
+from sprite import AnimatedSprite, CLOSED, OPENING, opening_frames
+import renderer
+import resources
+from resources import load_image
+from postfx import PostFX
+from camera import Camera
+from surfaces import get_overlay, get_solid, Spotlight
+import lighting
+from lighting import Light, LightMap
+from text_cache import render_text, Typewriter
+from dirty import DirtyRects
+from layers import Layer
+from pathfinding import NavGrid
+from spatial import SpatialHash
+from level import Level, RoomCache
+from functools import partial
+import profiler
+import savegame
 from dataclasses import dataclass, field
+from typing import Callable
 
-# 初始化
-pygame.init()
 WIDTH, HEIGHT = 960, 540
+LEVEL_PATH = "levels/default.json"
+# 已載入房間（導航格、圖片、背景）的記憶體上限，超過就淘汰離目前房間最遠的
+ROOM_MEMORY_BUDGET = 8 * 1024 * 1024
 FPS = 60
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("密室逃脫")
-clock = pygame.time.Clock()
-player = Player(600, 350, True)
+# 遊戲邏輯固定以 TICK_RATE 更新，畫面則不限速（0）並以插值呈現
+TICK_RATE = FPS
+TICK_MS = 1000 / TICK_RATE
+MAX_TICKS_PER_FRAME = 5
+# 淡入與換房間交叉淡化的長度
+FADE_TICKS = 20
+RENDER_FPS = 0
+# 沒有東西在動時，閃爍的光源每幾個 tick 才醒來更新一次（約 15 FPS）
+IDLE_FLICKER_TICKS = 4
+# 閒置時用計時器叫醒主迴圈的事件
+WAKE_EVENT = pygame.event.custom_type()
+# True：只重畫、只更新有變動的區域；False：每幀整個畫面重畫並 flip
+DIRTY_RECTS = True
+# 由 init() 建立：import 這個模組不會開視窗
+screen: pygame.Surface | None = None
+# 把畫面送到視窗的方式（見 renderer.py）；screen 就是 RENDERER.surface
+RENDERER: renderer.SurfaceRenderer | renderer.TextureRenderer | None = None
+clock: pygame.time.Clock | None = None
 # 顏色與字型
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
@@ -21,19 +58,51 @@ LIGHT_PURPLE = (132, 112, 255)
 RED = (255, 0, 0)
 GRAY = (80, 80, 80)
 LIGHT_GRAY = (150, 150, 150)
-FONT = pygame.font.SysFont("Microsoft JhengHei", 22)
-SMALL = pygame.font.SysFont("Microsoft JhengHei", 18)
-BIG = pygame.font.SysFont("Microsoft JhengHei", 42)
+FONT = SMALL = BIG = None
+MESSAGE_RECT = pygame.Rect(0, HEIGHT-160, WIDTH, 40)
+HUD_RECT = pygame.Rect(0, HEIGHT-160, WIDTH, 160)
+# 房間看得到的範圍：HUD 上面的部分
+PLAY_RECT = pygame.Rect(0, 0, WIDTH, HUD_RECT.y)
+INVENTORY_RECT = pygame.Rect(0, HEIGHT-120, WIDTH, 120)
+
+# 初始化；headless 用 SDL 的 dummy 驅動，不開真正的視窗。
+# backend 是 "surface"、"texture" 或 "software"，window_size 是視窗大小（畫面以整數倍放大）
+def init(headless=False, backend="surface", window_size=None):
+    global screen, clock, FONT, SMALL, BIG, RENDERER
+    if headless:
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+    pygame.init()
+    RENDERER = renderer.create(backend, (WIDTH, HEIGHT), "密室逃脫", window_size)
+    screen = RENDERER.surface
+    clock = pygame.time.Clock()
+    # 字型路徑第一次找到後就記在 .cache，之後啟動不必再搜尋系統字型
+    FONT = resources.font(22)
+    SMALL = resources.font(18)
+    BIG = resources.font(42)
+    return screen
 
 # 工具函式
-def draw_text(surf, text, pos, color=WHITE, font=FONT, center=False):
-    img = font.render(text, True, color)
+def join_names(names):
+    names = list(names)
+    return names[0] if len(names) == 1 else f"{'、'.join(names[:-1])} 和 {names[-1]}"
+
+# 全畫面的半透明遮罩；之後的內容要畫在回傳的 surface 上（texture renderer 會交給 GPU 畫遮罩）
+def dim(surf, alpha) -> pygame.Surface:
+    if RENDERER:
+        return RENDERER.dim(surf, alpha)
+    surf.blit(get_overlay((WIDTH, HEIGHT), (0, 0, 0, alpha)), (0, 0))
+    profiler.count("blits")
+    return surf
+
+def draw_text(surf, text, pos, color=WHITE, font=None, center=False):
+    img = render_text(font or FONT, text, color)
     rect = img.get_rect()
     if center:
         rect.center = pos
     else:
         rect.topleft = pos
     surf.blit(img, rect)
+    profiler.count("blits")
 
 # 物品
 @dataclass
@@ -41,6 +110,12 @@ class Item:
     name: str
     desc: str = ""
     icon_color: tuple = (230, 230, 230)
+    id: str = ""
+
+    # 規則表裡用的 id，沒有設定時用名稱
+    @property
+    def key(self):
+        return self.id or self.name
 
 @dataclass
 class GameObject:
@@ -54,134 +129,128 @@ class GameObject:
     code: str = ""
     contains: list[Item] = field(default_factory=list)
     image: pygame.Surface | None = None
-
-    def draw(self, surf, hover=False):
+    id: str = ""
+    # 外觀相關欄位改變時通知 (物件, 欄位, 舊值)，用來標記重畫區域
+    on_change: Callable | None = field(default=None, repr=False, compare=False)
+    # 開關動畫（門、抽屜），解鎖時播放；沒有就是一張固定的圖
+    anim: AnimatedSprite | None = field(default=None, repr=False, compare=False)
+
+    def __setattr__(self, name, value):
+        old = self.__dict__.get(name, value)
+        object.__setattr__(self, name, value)
+        if name in ("visible", "locked", "rect", "image") and old is not value and old != value:
+            if self.on_change:
+                self.on_change(self, name, old)
+
+    @property
+    def key(self):
+        return self.id or self.name
+
+    # offset：世界座標換成畫面座標要加的位移（見 Camera.offset）
+    def draw(self, surf, hover=False, offset=(0, 0)):
         if not self.visible:
             return
+        rect = self.rect.move(offset)
         if self.image:
-            surf.blit(self.image, self.rect.topleft)
+            surf.blit(self.image, rect.topleft)
+            profiler.count("blits")
         else:
             c = self.hover_color if hover else self.color
-            pygame.draw.rect(surf, c, self.rect, border_radius= 10)
-            pygame.draw.rect(surf, BLACK, self.rect, 2, border_radius=10)
-            draw_text(surf, self.name, (self.rect.x + 8, self.rect.y + 6), BLACK, SMALL)
-
-    def on_click(self, game):
-        if not self.visible:
-            return ""
-        if self.name == "門":  # 第一間房間
-            if self.locked:
-                if game.held_item and game.held_item.name == "鑰匙":
-                    self.locked = False
-                    return "你使用了鑰匙，門已解鎖！"
-                return "門被鎖住了，好像需要鑰匙。"
-            else:
-                game.enter_room2()
-                return "你打開門進入了下一間房間！"
-
-        if self.name == "木門":  # 第二間房間
-            if self.locked:
-                if game.held_item and game.held_item.name == "斧頭":
-                    self.locked = False
-                    return "你用斧頭砍開了木門！"
-                return "木門緊閉著，似乎需要工具。"
-            else:
-                game.win = True
-                return "你推開了木門，成功逃出第二間房間！"
-
-        if self.name == "抽屜":
-            if self.locked:
-                game.open_code_panel(self)
-                player.visible = False
-                return "抽屜有三位數密碼鎖。"
-            else:
-                if self.contains:
-                    item = self.contains.pop(0)
-                    game.add_to_inventory(item)
-                    return f"你從抽屜拿到『{item.name}』。"
-                return "抽屜是空的。"
-        if self.name == "放大鏡":
-            if self.visible:
-                game.add_to_inventory(Item("放大鏡", "這個是甚麼東西", icon_color = BLUE))
-                self.visible = False
-                return "你撿起了放大鏡"
-        if self.name == "便條紙":
-            if self.visible:
-                game.add_to_inventory(Item("便條紙", "上面寫著 3-1-4。", icon_color=YELLOW))
-                game.show_note_image = True
-                player.visible = False
-                self.visible = False
-                return "你撿起了便條紙。"
-        if self.name == "神秘鑰匙":
-            if self.visible:
-                self.visible = False
-                game.add_to_inventory(Item("神秘鑰匙", icon_color=YELLOW))
-                return "這把鑰匙是不是最後一道門的鎖"
-        if self.name == "書櫃":
-            return "一排舊書。其中一本書的書背特別厚…"
-        if self.name == "盒子":
-            if self.locked:
-                if game.held_item and game.held_item.name == "神秘鑰匙":
-                    self.locked = False
-                    return "盒子打開了，裡面有一把斧頭！"
-                return "盒子鎖住了，裡面似乎有東西。"
-            else:
-                if self.contains:
-                    item = self.contains.pop(0)
-                    game.add_to_inventory(item)
-                    return f"你從盒子拿到『{item.name}』。"
-                return "盒子是空的。"
-        return ""
+            pygame.draw.rect(surf, c, rect, border_radius= 10)
+            pygame.draw.rect(surf, BLACK, rect, 2, border_radius=10)
+            draw_text(surf, self.name, (rect.x + 8, rect.y + 6), BLACK, SMALL)
 
 # 物品欄 UI
 class Inventory:
     def __init__(self, capacity=6):
         self.capacity = capacity
-        self.items: list[Item] = []
+        # 以物品 id 為 key；dict 保留加入的順序，就是格子的順序
+        self.items: dict[str, Item] = {}
+        self._slots: list[Item] | None = None
         self.slot_rects = []
         margin = 12
         slot_w = 88
         x = (WIDTH - (slot_w + margin) * capacity + margin) // 2
         y = HEIGHT - 100
+        self.slots_x = x
+        self.slot_pitch = slot_w + margin
         for i in range(capacity):
             r = pygame.Rect(x + i * (slot_w + margin), y, slot_w, 80)
             self.slot_rects.append(r)
-
-    def draw(self, surf, held_item: Item | None):
-        pygame.draw.rect(surf, (30,30,35), (0, HEIGHT-120, WIDTH, 120))
-        pygame.draw.line(surf, (50,50,60), (0, HEIGHT-120), (WIDTH, HEIGHT-120), 2)
-        draw_text(surf, "物品欄", (20, HEIGHT-116), LIGHT_GRAY)
-        for i, r in enumerate(self.slot_rects):
+        self.dirty = True
+        self.drawn_held = None
+
+    # 不會變動的外框，烘焙進 HUD 圖層；offset 是圖層相對於畫面的位移
+    def draw_chrome(self, surf, offset=(0, 0)):
+        dx, dy = offset
+        pygame.draw.rect(surf, (30,30,35), (dx, HEIGHT-120+dy, WIDTH, 120))
+        pygame.draw.line(surf, (50,50,60), (dx, HEIGHT-120+dy), (WIDTH+dx, HEIGHT-120+dy), 2)
+        draw_text(surf, "物品欄", (20+dx, HEIGHT-116+dy), LIGHT_GRAY)
+        for r in self.slot_rects:
+            r = r.move(dx, dy)
             pygame.draw.rect(surf, (55,55,65), r, border_radius=10)
             pygame.draw.rect(surf, (10,10,10), r, 2, border_radius=10)
-            if i < len(self.items):
-                item = self.items[i]
-                #inflate用來放大或縮小矩形的尺寸
-                pygame.draw.rect(surf, item.icon_color, r.inflate(-20,-24), border_radius=8)
-                #讓文字靠又且靠底部
-                draw_text(surf, item.name, (r.x+6, r.bottom-24), BLACK, SMALL)
+
+    # 照格子順序排的物品，物品欄有變動時才重建
+    @property
+    def slots(self) -> list[Item]:
+        if self._slots is None:
+            self._slots = list(self.items.values())
+        return self._slots
+
+    def draw(self, surf, held_item: Item | None, selected=(), combinable=frozenset()):
+        for r, item in zip(self.slot_rects, self.slots):
+            #inflate用來放大或縮小矩形的尺寸
+            pygame.draw.rect(surf, item.icon_color, r.inflate(-20,-24), border_radius=8)
+            # 選了的物品框白色，還能和手上物品組合的框黃色
+            if item in selected:
+                pygame.draw.rect(surf, WHITE, r.inflate(-6,-6), 3, border_radius=10)
+            elif item.key in combinable:
+                pygame.draw.rect(surf, YELLOW, r.inflate(-6,-6), 3, border_radius=10)
+            #讓文字靠又且靠底部
+            draw_text(surf, item.name, (r.x+6, r.bottom-24), BLACK, SMALL)
         if held_item:
             draw_text(surf, f"手上物件：{held_item.name}", (20, HEIGHT-86), WHITE)
 
+    def dirty_rect(self, held_item: Item | None):
+        if self.dirty or held_item is not self.drawn_held:
+            self.dirty = False
+            self.drawn_held = held_item
+            return INVENTORY_RECT
+        return None
+
     def handle_click(self, pos) -> Item | None:
-        for i, r in enumerate(self.slot_rects):
-            if r.collidepoint(pos) and i < len(self.items):
-                return self.items[i]
+        # 格子等距排列，直接算出是第幾格
+        i = (pos[0] - self.slots_x) // self.slot_pitch
+        if 0 <= i < min(len(self.items), len(self.slot_rects)) and self.slot_rects[i].collidepoint(pos):
+            return self.slots[i]
         return None
 
+    # 物品欄滿了就不放進去，回傳 False
     def add(self, item: Item) -> bool:
-        if item not in self.items:
-            self.items.append(item)
+        if item.key in self.items:
+            return True
         if len(self.items) >= self.capacity:
             return False
+        self.items[item.key] = item
+        self._slots = None
+        self.dirty = True
         return True
     
     def remove(self, item: Item) -> bool:
-        if item in self.items:
-            self.items.remove(item)
+        if self.items.pop(item.key, None) is not None:
+            self._slots = None
+            self.dirty = True
+            return True
+        return False
+
+    def has(self, item_id: str):
+        return item_id in self.items
 
-    def has(self, item):
-        return item in self.items
+    def reset(self, items: list[Item]):
+        self.items = {item.key: item for item in items}
+        self._slots = None
+        self.dirty = True
 
 # 密碼輸入面板
 class CodePanel:
@@ -190,19 +259,26 @@ class CodePanel:
         self.length = length
         self.buffer = ""
         self.active = True
+        self.win_rect = pygame.Rect(0,0,420,240)
+        self.win_rect.center = (WIDTH//2, HEIGHT//2)
+        self.box_rect = pygame.Rect(0,0,240,60)
+        self.box_rect.center = (self.win_rect.centerx, self.win_rect.centery+10)
+        self.drawn_buffer = None
+
+    def dirty_rect(self):
+        if self.buffer != self.drawn_buffer:
+            self.drawn_buffer = self.buffer
+            return self.box_rect
+        return None
 
     def draw(self, surf):
-        overlay = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
-        overlay.fill((0,0,0,150))
-        surf.blit(overlay, (0,0))
-        win = pygame.Rect(0,0,420,240)
-        win.center = (WIDTH//2, HEIGHT//2)
+        surf = dim(surf, 150)
+        win = self.win_rect
         pygame.draw.rect(surf, (240,240,240), win, border_radius=16)
         pygame.draw.rect(surf, BLACK, win, 3, border_radius=16)
         draw_text(surf, "輸入三位數密碼", (win.centerx, win.y+20), BLACK, BIG, center=True)
         draw_text(surf, "提示：看看房間裡有沒有線索…", (win.centerx, win.y+70), BLACK, SMALL, center=True)
-        box = pygame.Rect(0,0,240,60)
-        box.center = (win.centerx, win.centery+10)
+        box = self.box_rect
         pygame.draw.rect(surf, WHITE, box, border_radius=10)
         pygame.draw.rect(surf, BLACK, box, 2, border_radius=10)
         s = self.buffer + "_"*(self.length - len(self.buffer))
@@ -212,14 +288,14 @@ class CodePanel:
     def handle_key(self, game, key):
         if key == pygame.K_ESCAPE:
             game.close_code_panel()
-            player.visible = True
+            game.player.visible = True
             return
         if key == pygame.K_BACKSPACE:
             self.buffer = self.buffer[:-1]
             return
         if key == pygame.K_RETURN:
             self.submit(game)
-            player.visible = True
+            game.player.visible = True
             return
         if pygame.K_0 <= key <= pygame.K_9 and len(self.buffer)<self.length:
             self.buffer += chr(key)
@@ -237,48 +313,88 @@ class CodePanel:
 
 # main
 class Game:
-    def __init__(self):
+    # seed 固定時，同樣的輸入一定得到同樣的結果
+    def __init__(self, seed=None, prefetch=True):
+        self.seed = seed
+        self.rng = random.Random(seed)
+        # 每一局自己的狀態都掛在 Game 上，同一個行程可以同時跑很多局
+        self.player = Player(600, 350, True)
+        # 按 Esc 時呼叫；main() 設成 quit_game
+        self.on_quit = None
         self.dark_room = True
         self.light_radius = 150
+        self.spotlight = Spotlight((WIDTH, HEIGHT), self.light_radius)
+        # 有 numpy 時用可以有多個光源的光照圖，沒有就退回單一光圈
+        self.light_map = LightMap((WIDTH, HEIGHT)) if lighting.available else None
+        self.player_light = Light((600, 350), self.light_radius * 4 // 3, (220, 220, 220))
         self.shake_frames = 0
         self.shake_intensity = 5
+        # 場景的後製：震動、淡入、換房間的交叉淡化
+        self.postfx = PostFX((WIDTH, HEIGHT))
+        # 房間比畫面大時跟著人物捲動
+        self.camera = Camera(PLAY_RECT.size)
+        self.ticks = 0
         self.messages_to_type = [
             "頭好痛。。。。這裡是哪裡。。。。",
             "這裡怎麼特別的簡陋阿。。。。怪了。。。。。",
         ]
         self.main_message = "醒來時，你身處陌生的房間。試著找線索逃出去。"
-        self.current_message_index = 0
         self.typed_message = ""
+        self.typewriter = Typewriter(FONT, WHITE)
         self.message_stage = "intro"
         self.type_speed = 2
-        self.type_index = 0
-        self.eye_phase = 0
         self.message_done = False
-        self.eye_progress = 0
+        # 開場動畫；播完（或跳過）之後設成 None，不再出現在每幀的流程裡
+        self.intro: EyeIntro | None = None
         self.eye_done = False
-        self.current_room = 1
+        self.start_intro()
+        self.level = Level(LEVEL_PATH)
+        self.current_room = self.level.start_room
+        self.item_defs = self.level.items
+        self.rules = self.level.rules
+        self.recipes = self.level.recipes
+        # 規則裡的動作名稱 -> act_ 方法
+        self.actions = {name[4:]: getattr(self, name) for name in dir(type(self)) if name.startswith("act_")}
+        unknown = self.rules.actions() - self.actions.keys()
+        if unknown:
+            raise ValueError(f"未知的互動動作：{sorted(unknown)}")
         self.show_note_image = False
-        raw_note = pygame.image.load("assets/Note.png").convert_alpha() 
-        self.note_image = pygame.transform.smoothscale(raw_note, (400, 300))
         self.room_solve = False
         self.inventory = Inventory(capacity=7)
         self.objects: list[GameObject] = []
-        self.held_item: Item | None = None
+        self.held_item = None
         self.code_panel: CodePanel | None = None
         self.win = False
-        self.rooms = {
-            1: {"objects": None, "message": None},
-            2: {"objects": None, "message": None}
-        }
-        self.setup_room1()
-        self.setup_room2()
-        self.switch_room(1)
-        self.eye_opening = True
-        self.eye_alpha = 255
-        self.combinations = {
-            tuple(sorted(["便條紙", "放大鏡"])): "解碼便條紙",
-            tuple(sorted(["key_part1", "key_part2"])): "完整鑰匙"
-        }
+        self.hovered: GameObject | None = None
+        # 正在播開關動畫的物件
+        self.animating: list[GameObject] = []
+        self.dirty = DirtyRects((0, 0, WIDTH, HEIGHT))
+        self.drawn_overlay = None
+        self.drawn_message = None
+        self.was_postfx = False
+        self.hud_layer = Layer(HUD_RECT, self.bake_hud)
+        self.room_cache = RoomCache(self.level, self.build_room, self.room_bytes, ROOM_MEMORY_BUDGET, prefetch)
+        self.rooms = self.room_cache.rooms
+        # 被淘汰的房間裡，和定義不同的物件狀態；重新載入時套回去
+        self.room_state: dict[int, dict] = {}
+        # 換房間時自動存檔（savegame.Autosaver），沒有設定就不存
+        self.autosave = None
+        self.switch_room(self.level.start_room)
+
+    def start_intro(self):
+        self.intro = EyeIntro((WIDTH, HEIGHT), self.messages_to_type, Typewriter(FONT, WHITE), TICK_RATE, self.type_speed)
+        self.eye_done = False
+        self.message_stage = "intro"
+        self.player.visible = False
+
+    def end_intro(self):
+        self.intro = None
+        self.eye_done = True
+        self.message_stage = "main"
+        self.typed_message = ""
+        self.player.visible = True
+        self.postfx.fade_in(FADE_TICKS)
+        self.dirty.add_full()
 
     def trigger_shake(self, frames = 10, intensity = 5):
         self.shake_frames = frames
@@ -286,105 +402,385 @@ class Game:
 
     def get_shake_offset(self):
         if self.shake_frames > 0:
-            import random
-            offset = (random.randint(-self.shake_intensity, self.shake_intensity),
-                      random.randint(-self.shake_intensity, self.shake_intensity))
+            offset = (self.rng.randint(-self.shake_intensity, self.shake_intensity),
+                      self.rng.randint(-self.shake_intensity, self.shake_intensity))
             self.shake_frames -= 1
             return offset
         return (0, 0)
 
-    def try_combine(self, item1_name, item2_name):
-        pair = tuple(sorted([item1_name, item2_name]))
-        if pair in self.combinations:
-            new_item_name = self.combinations[pair]
-
-        # 移除原本物品
-            for item in self.inventory.items[:]:
-                if item.name in pair:
-                    self.inventory.remove(item)
-
-        # 新增新物品
-            new_item = Item(new_item_name, icon_color=(200, 200, 0))
-            self.inventory.add(new_item)
-
-            self.message = f"你組合了 {item1_name} 和 {item2_name}，得到 {new_item_name}！"
-            return True
-        else:
-            self.message = f"{item1_name} 和 {item2_name} 無法組合。"
+    # 手上拿的物品；換手時重設組合中選的物品，以及還能和它組合的物品
+    @property
+    def held_item(self) -> Item | None:
+        return self._held_item
+
+    @held_item.setter
+    def held_item(self, item: Item | None):
+        self._held_item = item
+        self.selection: list[Item] = [item] if item else []
+        self.combinable = self.recipes.partners([item.key]) if item else frozenset()
+        self.inventory.dirty = True
+
+    # 依組合表組合選的物品；材料全部拿掉，產物全部放進物品欄
+    def combine(self, items: list[Item]) -> bool:
+        recipe = self.recipes.match(item.key for item in items)
+        names = [item.name for item in items]
+        if recipe is None:
+            self.message = f"{join_names(names)} 無法組合。"
             return False
+        # 產物比材料多時，先確定物品欄放得下再拿掉材料
+        kept = self.inventory.items.keys() - {item.key for item in items}
+        if len(kept | set(recipe.outputs)) > self.inventory.capacity:
+            self.message = "物品欄已滿。"
+            return False
+        for item in items:
+            self.inventory.remove(item)
+        outputs = [self.make_item(item_id) for item_id in recipe.outputs]
+        for item in outputs:
+            self.inventory.add(item)
+        self.message = recipe.message or f"你組合了 {join_names(names)}，得到 {join_names([i.name for i in outputs])}！"
+        return True
 
-    # 一房間
-    def setup_room1(self):
-        door_img = pygame.Surface((120,240))
-        door_img.fill(BLUE)
-        door = GameObject("門", door_img.get_rect(topleft=(WIDTH-160,120)), BLUE, (90,170,250), locked=True, image=door_img)
-    
-        drawer_img = pygame.Surface((160,100))
-        drawer_img.fill(BROWN)
-        drawer = GameObject("抽屜", drawer_img.get_rect(topleft=(180,300)), BROWN, (150,120,90), locked=True, code="314", image=drawer_img)
-        drawer.contains.append(Item("鑰匙", "可以打開門的鑰匙", icon_color=YELLOW))
-
-        bookshelf_img = pygame.Surface((220,160))
-        bookshelf_img.fill((110,80,50))
-        bookshelf = GameObject("書櫃", bookshelf_img.get_rect(topleft=(80,120)), (110,80,50), (140,100,70), image=bookshelf_img)
-
-        magnifier_img = pygame.Surface((160, 20))
-        magnifier_img.fill(BLUE)
-        magnifier = GameObject("放大鏡", magnifier_img.get_rect(topleft = (160, 30)), BLUE, (0, 255, 0), image = magnifier_img)
-
-        note_img = pygame.Surface((80,40))
-        note_img.fill(YELLOW)
-        note = GameObject("便條紙", note_img.get_rect(topleft=(360,180)), YELLOW, (255,230,90), image=note_img)
-        
-        inventory_rect = pygame.Rect(0, HEIGHT-159, WIDTH, 159) 
-
-        self.rooms[1]["objects"] = [magnifier, door, drawer, bookshelf, note]
-        self.rooms[1]["message"] = "醒來時，你身處陌生的房間。試著找線索逃出去。"
-        self.rooms[1]["obstacles"] = [door.rect, bookshelf.rect, drawer.rect] + [inventory_rect]
-        
-    # 二房間
-    def setup_room2(self):
-        door_img = pygame.Surface((360,50))
-        door_img.fill(BLUE)
-        door = GameObject("木門", door_img.get_rect(topleft = (350,10)), BLUE, (90,170,250), locked=True, image=door_img)
-
-        box_img = pygame.Surface((160,100))
-        box_img.fill(LIGHT_PURPLE)
-        box = GameObject("盒子", box_img.get_rect(topleft=(300,300)), LIGHT_PURPLE, (123,104,238), locked=True, image=box_img)
-        box.contains.append(Item("斧頭", "可以打破障礙物", icon_color=RED))
-
-        key_img = pygame.Surface((40, 40))
-        key_img.fill(YELLOW)
-        key = GameObject("神秘鑰匙", key_img.get_rect(topleft = (20, 20)), YELLOW, (255,230,90), image = key_img)
+    # 房間載入：依關卡檔的定義建立物件（可能在背景執行緒執行）
+    def make_object(self, spec: dict) -> GameObject:
+        rect = pygame.Rect(spec["rect"])
+        color = tuple(spec["color"])
+        anim = None
+        if spec.get("animation"):
+            anim = AnimatedSprite(opening_frames(spec["animation"], rect.size, color), fps=12, loops=[True, False])
+        obj = GameObject(spec["name"], rect, color, tuple(spec["hover_color"]),
+                         visible=spec.get("visible", True), locked=spec.get("locked", False),
+                         code=spec.get("code", ""),
+                         contains=[self.make_item(i) for i in spec.get("contains", [])],
+                         image=get_solid(rect.size, color), id=spec["id"], anim=anim)
+        self.sync_animation(obj)
+        return obj
+
+    # 有開關動畫的物件依 locked 停在關著或打開；animate 時從頭播打開的過程
+    def sync_animation(self, obj: GameObject, animate=False):
+        anim = obj.anim
+        if anim is None:
+            return
+        anim.play(CLOSED if obj.locked else OPENING, restart=True)
+        if not animate:
+            anim.finish()
+        elif obj not in self.animating:
+            self.animating.append(obj)
+        obj.image = anim.image
+
+    def build_room(self, room_number: int) -> dict:
+        spec = self.level.rooms[room_number]
+        objects = [self.make_object(o) for o in spec["objects"]]
+        # 用 get 而不是 pop：背景預載時，主執行緒還可能拿 room_state 做快照
+        state = self.room_state.get(room_number)
+        if state:
+            self.apply_room_state(objects, state)
+            for obj in objects:
+                self.sync_animation(obj)
+        for obj in objects:
+            obj.on_change = partial(self.object_changed, room_number)
+        obstacles = [obj.rect for obj, o in zip(objects, spec["objects"]) if o.get("obstacle")]
+        obstacles += [pygame.Rect(r) for r in spec.get("obstacles", [])]
+        lights = [Light(tuple(l["pos"]), l["radius"], tuple(l.get("color", (200, 200, 200))),
+                        l.get("flicker", 0.0), phase=i * 1.7) for i, l in enumerate(spec.get("lights", []))]
+        # 房間的大小（世界座標），沒有設定時就是 HUD 上面看得到的範圍
+        size = tuple(spec.get("size", PLAY_RECT.size))
+        return {
+            "objects": objects,
+            "message": spec["message"],
+            "obstacles": obstacles,
+            "size": size,
+            "nav": NavGrid(size, obstacles),
+            "background": Layer((0, 0, WIDTH, HEIGHT), partial(self.bake_room, room_number)),
+            "index": SpatialHash(),
+            "lights": lights,
+            "ambient": tuple(spec.get("ambient", (55, 55, 55))),
+        }
 
-        inventory_rect = pygame.Rect(0, HEIGHT-159, WIDTH, 159) 
+    def apply_room_state(self, objects: list[GameObject], state: dict):
+        for obj in objects:
+            delta = state.get(obj.id)
+            if not delta:
+                continue
+            if "visible" in delta:
+                obj.visible = delta["visible"]
+            if "locked" in delta:
+                obj.locked = delta["locked"]
+            if "contains" in delta:
+                obj.contains = [self.make_item(i) for i in delta["contains"]]
+
+    # 淘汰房間前，只留下和定義不同的部分；還在播的開關動畫直接停掉
+    def save_room_state(self, room_number: int, room: dict):
+        objects = room["objects"]
+        self.animating = [obj for obj in self.animating if obj not in objects]
+        state = self.room_delta(room_number, room)
+        if state:
+            self.room_state[room_number] = state
+        else:
+            self.room_state.pop(room_number, None)
+
+    def room_delta(self, room_number: int, room: dict) -> dict:
+        state = {}
+        for spec, obj in zip(self.level.rooms[room_number]["objects"], room["objects"]):
+            delta = {}
+            if obj.visible != spec.get("visible", True):
+                delta["visible"] = obj.visible
+            if obj.locked != spec.get("locked", False):
+                delta["locked"] = obj.locked
+            contains = [item.key for item in obj.contains]
+            if contains != spec.get("contains", []):
+                delta["contains"] = contains
+            if delta:
+                state[obj.id] = delta
+        return state
+
+    # 存檔：房間只記和定義不同的部分，物品只記 id
+    def snapshot(self) -> dict:
+        rooms = dict(self.room_state)
+        for room_number, room in list(self.rooms.items()):
+            delta = self.room_delta(room_number, room)
+            if delta:
+                rooms[room_number] = delta
+            else:
+                rooms.pop(room_number, None)
+        items = self.inventory.slots
+        return {
+            "room": self.current_room,
+            "ticks": self.ticks,
+            "rooms": rooms,
+            "inventory": list(self.inventory.items),
+            "held": items.index(self.held_item) if self.held_item in items else None,
+            "player": [self.player.x, self.player.y],
+            "room_solve": self.room_solve,
+            "win": self.win,
+            "intro": [self.eye_done, self.message_stage],
+            "message": self.message,
+        }
 
-        self.rooms[2]["objects"] = [door, box, key]
-        self.rooms[2]["message"] = "你進入了第二間房間，似乎還有物品可以探索。"
-        self.rooms[2]["obstacles"] = [door.rect, box.rect] + [inventory_rect]
-        
-    def enter_room2(self):
-        self.switch_room(2)
+    # 讀檔：沿用已載入的關卡、圖片與房間，只把狀態改回存檔的樣子
+    def restore(self, snapshot: dict):
+        for room_number in list(self.room_cache.pending):
+            self.room_cache.get(room_number)
+        self.room_state = {n: s for n, s in snapshot["rooms"].items() if n not in self.rooms}
+        for room_number, room in self.rooms.items():
+            self.reset_room(room_number, room, snapshot["rooms"].get(room_number, {}))
+        self.ticks = snapshot["ticks"]
+        self.room_solve = snapshot["room_solve"]
+        self.win = snapshot["win"]
+        eye_done, message_stage = snapshot["intro"]
+        if not eye_done:
+            self.start_intro()
+        elif self.intro:
+            self.end_intro()
+        self.eye_done, self.message_stage = eye_done, message_stage
+        if self.message_stage == "main":
+            self.typed_message = self.main_message
+        self.show_note_image = False
+        self.shake_frames = 0
+        self.postfx.reset()
+        self.switch_room(snapshot["room"])
+        self.message = snapshot["message"]
+        self.inventory.reset([self.make_item(key) for key in snapshot["inventory"]])
+        held = snapshot["held"]
+        self.held_item = self.inventory.slots[held] if held is not None else None
+        # 人物藏起來只是因為開著便條紙或密碼面板，讀檔後都關掉了，只有開場動畫時看不到
+        self.player.x, self.player.y = snapshot["player"][:2]
+        self.player.visible = self.intro is None
+        self.player.prev_x, self.player.prev_y = self.player.x, self.player.y
+        self.player.set_path([])
+        self.dirty.add_full()
+
+    def reset_room(self, room_number: int, room: dict, state: dict):
+        for spec, obj in zip(self.level.rooms[room_number]["objects"], room["objects"]):
+            delta = state.get(obj.id, {})
+            obj.visible = delta.get("visible", spec.get("visible", True))
+            obj.locked = delta.get("locked", spec.get("locked", False))
+            obj.contains = [self.make_item(i) for i in delta.get("contains", spec.get("contains", []))]
+            self.sync_animation(obj)
+
+    def room_bytes(self, room: dict) -> int:
+        size = len(room["nav"].blocked)
+        surfaces = [obj.image for obj in room["objects"] if obj.image]
+        if room["background"].surface:
+            surfaces.append(room["background"].surface)
+        for surf in surfaces:
+            size += surf.get_width() * surf.get_height() * surf.get_bytesize()
+        return size
+
+    def enter_room(self, room_number: int):
+        if room_number != self.current_room:
+            self.postfx.cross_fade(FADE_TICKS)
+        self.switch_room(room_number)
         self.held_item = None
         self.code_panel = None
+        if self.autosave:
+            self.autosave.save(self.snapshot())
 
     def switch_room(self, room_number: int):
-        global obstacles
-        if room_number in self.rooms:
+        if room_number in self.level.rooms:
+            room = self.room_cache.get(room_number)
+            # 離開的房間不必留著烘焙好的背景
+            if self.current_room in self.rooms and self.current_room != room_number:
+                background = self.rooms[self.current_room].get("background")
+                if background:
+                    background.release()
             self.current_room = room_number
-            self.objects = self.rooms[room_number]["objects"]
-            self.message = self.rooms[room_number]["message"]
-            obstacles = self.rooms[room_number]["obstacles"]
+            self.objects = room["objects"]
+            self.message = room["message"]
             self.code_panel = None
             self.held_item = None
-            
+            self.hovered = None
+            room["background"].invalidate()
+            self.camera.set_world(room["size"])
+            self.camera.follow((self.player.x, self.player.y))
+            self.dirty.add_full()
+            self.room_cache.prefetch(self.level.exits(room_number))
+            self.room_cache.evict(room_number, self.save_room_state)
+
+    # 靜態圖層
+    # 背景圖層只有畫面大小：用空間索引找出和畫面相交的物件，只畫這些
+    def bake_room(self, room_number: int, surf):
+        room = self.rooms[room_number]
+        ox, oy = offset = self.camera.offset
+        w, h = room["size"]
+        surf.fill((35,38,48))
+        # 牆一直延伸到 HUD 底下（HUD 是不透明的，會蓋住多出來的部分）
+        pygame.draw.rect(surf, (60,65,80), (ox, oy, w, h + HUD_RECT.height - 120))
+        index = room["index"]
+        if index.dirty:
+            index.rebuild(room["objects"])
+        for obj in index.query_rect(self.camera.rect):
+            obj.draw(surf, offset=offset)
+
+    def bake_hud(self, surf):
+        pygame.draw.rect(surf, (25,26,34), (0, 0, WIDTH,40))
+        pygame.draw.line(surf, (55,58,70), (0, 0), (WIDTH, 0), 2)
+        self.inventory.draw_chrome(surf, (0, -HUD_RECT.y))
+
+    # 重畫區域
+    def object_changed(self, room_number: int, obj: GameObject, name, old):
+        # 房間已經被淘汰，下次載入會重新建立
+        if room_number not in self.rooms:
+            return
+        if name == "locked":
+            self.sync_animation(obj, animate=True)
+        self.rooms[room_number]["background"].invalidate()
+        if name in ("visible", "rect"):
+            self.rooms[room_number]["index"].dirty = True
+        if room_number != self.current_room:
+            return
+        if name == "rect":
+            self.add_dirty_world(old)
+        self.add_dirty_world(obj.rect)
+        if obj is self.hovered:
+            if name != "rect":
+                self.add_dirty_world(self.tooltip_rect(obj))
+            if name == "rect":
+                self.dirty.add_full()
+            if not obj.visible:
+                self.set_hovered(None)
+
+    # 以世界座標標記重畫區域
+    def add_dirty_world(self, rect):
+        self.dirty.add(self.camera.to_screen_rect(rect))
+
+    # 畫面跟著人物捲動；捲動時背景要重新烘焙、整個畫面重畫
+    def update_camera(self):
+        if self.camera.follow((self.player.render_x, self.player.render_y)):
+            self.rooms[self.current_room]["background"].invalidate()
+            self.dirty.add_full()
+
+    def tooltip_rect(self, obj: GameObject):
+        text_rect = render_text(FONT, obj.name, WHITE).get_rect(center=(obj.rect.centerx, obj.rect.top - 15))
+        return text_rect.inflate(10, 6)
+
+    def set_hovered(self, obj: GameObject | None):
+        if obj is self.hovered:
+            return
+        for o in (self.hovered, obj):
+            if o:
+                self.add_dirty_world(o.rect)
+                self.add_dirty_world(self.tooltip_rect(o))
+        self.hovered = obj
+
+    # 滑鼠底下最上層、看得到的物件
+    def object_at(self, pos) -> GameObject | None:
+        index = self.rooms[self.current_room]["index"]
+        if index.dirty:
+            index.rebuild(self.objects)
+        return index.at(pos)
+
+    # 只在滑鼠移動時呼叫；pos 是畫面座標
+    def update_hover(self, pos):
+        self.set_hovered(self.object_at_screen(pos))
+
+    # 畫面座標底下的物件；HUD 蓋住的地方不算
+    def object_at_screen(self, pos) -> GameObject | None:
+        if not PLAY_RECT.collidepoint(pos):
+            return None
+        return self.object_at(self.camera.to_world(pos))
+
+    def collect_dirty(self) -> list[pygame.Rect]:
+        if not self.intro:
+            self.update_camera()
+        # 後製效果作用在整個場景，有效果的那幾幀（和結束後的一幀）都整個重畫
+        effects = self.postfx.active
+        if (self.intro and self.intro.changed) or effects or self.was_postfx:
+            self.dirty.add_full()
+        self.was_postfx = effects
+        overlay = (self.eye_done, self.code_panel, self.show_note_image, self.win, self.current_room)
+        if overlay != self.drawn_overlay:
+            self.drawn_overlay = overlay
+            self.dirty.add_full()
+        if self.message_stage in ("main", "intro"):
+            message = self.typed_message
+        else:
+            message = self.message
+        if (self.message_stage, message) != self.drawn_message:
+            self.drawn_message = (self.message_stage, message)
+            self.dirty.add(MESSAGE_RECT)
+        self.dirty.add(self.inventory.dirty_rect(self.held_item))
+        if self.code_panel:
+            self.dirty.add(self.code_panel.dirty_rect())
+        player_rect = self.player.dirty_rect(self.camera.offset)
+        if player_rect:
+            self.dirty.add(player_rect)
+            if self.dark_room and not self.light_map:
+                self.dirty.add(self.spotlight.hole)
+                self.dirty.add(self.camera.to_screen_rect(self.spotlight.sprite.get_rect(
+                    center=(int(self.player.render_x), int(self.player.render_y)))))
+        if self.dark_room and self.light_map and self.eye_done:
+            for rect in self.light_map.dirty(self.lights(), self.camera.offset):
+                self.dirty.add(rect)
+        return self.dirty.take()
+
+    # 便條紙第一次打開時才載入（或由 preload 在背景先載好）
+    @property
+    def note_image(self) -> pygame.Surface:
+        return load_image("Note.png", (400, 300), smooth=True)
+
+    # 開場動畫播放時在背景執行：先載入之後才用得到的圖片與光圈貼圖
+    def preload(self):
+        self.note_image
+        if lighting.available:
+            for light in [self.player_light, *self.rooms[self.current_room]["lights"]]:
+                lighting.falloff_texture(light.radius, light.color)
+
+    # 目前房間的光源，第一個是跟著人物的光
+    def lights(self) -> list[Light]:
+        self.player_light.pos = (self.player.render_x, self.player.render_y)
+        return [self.player_light, *self.rooms[self.current_room]["lights"]]
+
+    # 走路：在目前房間的導航格上找路
+    def find_path(self, start, goal):
+        return self.rooms[self.current_room]["nav"].find_path(start, goal)
 
     # 物品欄操作
-    def add_to_inventory(self, item: Item):
+    def add_to_inventory(self, item: Item) -> bool:
         if self.inventory.add(item):
             self.message = f"獲得物品：{item.name}"
-        else:
-            self.message = "物品欄已滿。"
+            return True
+        self.message = "物品欄已滿。"
+        return False
 
     # 密碼輸入
     def open_code_panel(self, target: GameObject):
@@ -393,155 +789,152 @@ class Game:
     def close_code_panel(self):
         self.code_panel = None
 
-    # 手上物件使用
-    def use_item_on(self, item: Item, obj: GameObject) -> str:
-        if item.name == "鑰匙" and obj.name == "門":
-            if obj.locked:
-                obj.locked = False
-                self.room_solve = True
-                return "你用鑰匙把門解鎖了。"
-            return "門已經是開鎖狀態。"
-        if item.name == "便條紙":
-            return "便條紙上寫著 3-1-4，也許是密碼。"
-        if item.name == "神秘鑰匙" and obj.name == "盒子":
-            if obj.locked:
-                obj.locked = False
-                return "你用神秘鑰匙把盒子打開了"
-            return "裡面似乎有一把斧頭"
-        if item.name == "斧頭" and obj.name == "木門":
-            obj.locked = False
-            return "你用斧頭砍開了門！"
-        return "這個物品不能用在這裡。"
+    def make_item(self, item_id: str) -> Item:
+        spec = self.item_defs[item_id]
+        return Item(spec["name"], spec.get("desc", ""), icon_color=tuple(spec["color"]), id=item_id)
+
+    # 點擊物件（手上可能拿著物品）：查規則表後依序執行動作
+    def interact(self, item: Item | None, obj: GameObject) -> str:
+        state = "locked" if obj.locked else "open"
+        rule = self.rules.lookup(item.key if item else None, obj.key, state)
+        if rule is None:
+            return "這個物品不能用在這裡。" if item else ""
+        message = rule.message
+        for name, *args in rule.actions:
+            result = self.actions[name](obj, rule, *args)
+            # 動作做不到（例如物品欄滿了）就不再執行後面的動作
+            if result is False:
+                return self.message
+            if result is not None:
+                message = result
+        return message
+
+    # 規則動作；回傳字串時取代規則的訊息，回傳 False 時中止，訊息用 self.message
+    def act_unlock(self, obj, rule):
+        obj.locked = False
+
+    def act_hide(self, obj, rule):
+        obj.visible = False
+
+    def act_give(self, obj, rule, item_id):
+        if not self.add_to_inventory(self.make_item(item_id)):
+            return False
+
+    def act_take(self, obj, rule):
+        if not obj.contains:
+            return rule.empty
+        item = obj.contains[0]
+        if not self.add_to_inventory(item):
+            return False
+        obj.contains.pop(0)
+        return rule.message.format(item=item.name)
+
+    def act_code_panel(self, obj, rule):
+        self.open_code_panel(obj)
+
+    def act_hide_player(self, obj, rule):
+        self.player.visible = False
+
+    def act_show_note(self, obj, rule):
+        self.show_note_image = True
+
+    def act_solve(self, obj, rule):
+        self.room_solve = True
+
+    def act_enter_room(self, obj, rule, room_number):
+        self.enter_room(room_number)
+
+    def act_win(self, obj, rule):
+        self.win = True
 
     # 畫面
     def draw(self, surf):
-        surf.fill((35,38,48))
-        pygame.draw.rect(surf, (60,65,80), (0,0,WIDTH, HEIGHT-120))
-
-        if not self.eye_done:
-            self.draw_eye_animation(surf)
+        if self.intro:
+            self.intro.draw(surf)
             return
-        mx,my = pygame.mouse.get_pos()
-        hovered_name = None
-        hovered_rect = None
-        for obj in self.objects:
-            hover = obj.rect.collidepoint((mx,my))
-            obj.draw(surf, hover=hover)
-            if hover:
-                hovered_name = obj.name
-                hovered_rect = obj.rect
-        
-        if hovered_name and hovered_rect:
-            text_surf = FONT.render(hovered_name, True, WHITE)
-            text_rect = text_surf.get_rect(center=(hovered_rect.centerx, hovered_rect.top - 15))
-
-            bg_rect = text_rect.inflate(10, 6)
-            overlay = pygame.Surface(bg_rect.size, pygame.SRCALPHA)
-            overlay.fill((0, 0, 0, 100))
-            surf.blit(overlay, bg_rect.topleft)
-
-            surf.blit(text_surf, text_rect)
-
-        offset = self.get_shake_offset()
-        screen.blit(surf, offset)
-        if self.dark_room:
-            mask = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
-            mask.fill((0,0,0,200))
+        self.update_camera()
+        offset = self.camera.offset
+        # 場景：有後製效果時畫在 postfx 的離屏緩衝上，沒有時直接畫在畫面上
+        scene = self.postfx.begin(surf)
+        # 房間背景與物件都已烘焙好，只剩滑鼠停留的物件需要另外畫
+        self.rooms[self.current_room]["background"].draw(scene)
+        if self.hovered and not self.hovered.image:
+            self.hovered.draw(scene, hover=True, offset=offset)
+
+        if self.hovered:
+            text_surf = render_text(FONT, self.hovered.name, WHITE)
+            bg_rect = self.camera.to_screen_rect(self.tooltip_rect(self.hovered))
+            scene.blit(get_overlay(bg_rect.size, (0, 0, 0, 100)), bg_rect.topleft)
+
+            scene.blit(text_surf, text_surf.get_rect(center=bg_rect.center))
+            profiler.count("blits", 2)
+
+        # 暗房色調直接在場景上處理，不需要另外的緩衝
+        if self.dark_room and self.light_map:
+            with profiler.scope("lighting"):
+                self.light_map.ambient = self.rooms[self.current_room]["ambient"]
+                self.light_map.draw(scene, self.lights(), self.ticks / TICK_RATE, offset)
+        elif self.dark_room:
             # 光圈中心使用 player.x, player.y
-            pygame.draw.circle(mask, (0,0,0,0), (int(player.x), int(player.y)), self.light_radius)
-            screen.blit(mask, (0,0))
-        
-        player.draw(screen)
-
+            self.spotlight.draw(scene, self.camera.to_screen((self.player.render_x, self.player.render_y)))
+        with profiler.scope("postfx"):
+            self.postfx.finish(surf)
 
+        # 人物只畫這一次，在 HUD 和便條紙、密碼面板這些蓋在上面的東西之前
+        with profiler.scope("player.draw"):
+            self.player.draw(surf, offset)
 
-        pygame.draw.rect(surf, (25,26,34), (0, HEIGHT-160, WIDTH,40))
-        pygame.draw.line(surf, (55,58,70), (0, HEIGHT-160), (WIDTH, HEIGHT-160), 2)
-        self.inventory.draw(surf, self.held_item)
+        self.hud_layer.draw(surf)
+        self.inventory.draw(surf, self.held_item, self.selection, self.combinable)
         if self.message_stage in ("main", "intro"):
-            draw_text(surf, self.typed_message, (16, HEIGHT - 148), WHITE)
+            self.typewriter.set_text(self.typed_message)
+            self.typewriter.draw(surf, (16, HEIGHT - 148))
         elif self.message_stage == "done":
             draw_text(surf, self.message, (16, HEIGHT - 149), WHITE)
+        with profiler.scope("overlays"):
+            self.draw_overlays(surf)
+
+    def draw_overlays(self, surf):
         if self.code_panel:
             self.code_panel.draw(surf)
         if self.show_note_image:
-            overlay = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
-            overlay.fill((0, 0, 0, 160))
-            surf.blit(overlay, (0, 0))
+            surf = dim(surf, 160)
 
             img = self.note_image.get_rect(center = (WIDTH // 2 - 10, HEIGHT // 2 - 10))
             surf.blit(self.note_image, img)
+            profiler.count("blits")
             draw_text(surf, "按 ESC 關閉", (WIDTH//2, HEIGHT//2 + img.height//2 + 20), WHITE, FONT, center=True)
         if self.win:
-            overlay = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
-            overlay.fill((0,0,0,160))
-            surf.blit(overlay, (0,0))
+            surf = dim(surf, 160)
             draw_text(surf, "你逃出了房間！", (WIDTH//2, HEIGHT//2-20), WHITE, BIG, center=True)
             draw_text(surf, "恭喜通關！按 ESC 結束", (WIDTH//2, HEIGHT//2+30), WHITE, FONT, center=True)
     
-    def draw_eye_animation(self, surf):
-        if self.eye_done:
-            return
-
-        if self.eye_phase == 0 and self.eye_progress == 0:
-            player.visible = False
-        clock.tick(54)
-        mask = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
-        mask.fill((0, 0, 0, 255))
-
-        max_h = HEIGHT * 0.6
-        min_h = HEIGHT * 0.1
-        w = WIDTH * 0.9
-
-        if self.eye_phase == 0:
-            h = min_h + (max_h - min_h) * self.eye_progress
-        elif self.eye_phase == 1:
-            h = max_h - (max_h - min_h) * self.eye_progress
-        else:
-            h = min_h + (max_h - min_h) * self.eye_progress
-        
-        
-        ellipse_rect = pygame.Rect(0, 0, w, h)
-        ellipse_rect.center = (WIDTH // 2, HEIGHT // 2)
-        pygame.draw.ellipse(mask, (255, 255, 255), ellipse_rect)
-        mask.set_colorkey((255, 255, 255))
-        draw_text(surf, self.typed_message, (WIDTH // 2, HEIGHT - 80), WIDTH, FONT, center = True)
-        surf.blit(mask, (0, 0))
-
-        self.eye_progress += 0.02
-        if self.eye_progress >= 1:
-            self.eye_progress = 0
-            self.eye_phase += 1
-            if self.eye_phase > 2:
-                self.eye_done = True
-                player.visible = True
-        draw_text(surf, self.typed_message, (WIDTH // 2, HEIGHT - 80), WHITE, FONT, center=True)
-
-
-
     # 滑鼠操作
     def handle_mouse_down(self, pos):
         if self.code_panel:
             return
         item = self.inventory.handle_click(pos)
         if item:
-            if self.held_item:
-                if self.try_combine(self.held_item.name, item.name):
+            if not self.held_item:
+                self.held_item = item
+                self.message = f"手上物件：{item.name}"
+            elif item.key in self.combinable and item not in self.selection:
+                self.selection.append(item)
+                if self.combine(self.selection):
                     self.held_item = None
                 else:
-                    self.message = f"無法組合 {self.held_item.name}和{item.name}"
-                    self.held_item = None
+                    # 還少材料，繼續選
+                    self.combinable = self.recipes.partners(i.key for i in self.selection)
+                    self.inventory.dirty = True
+                    self.message = f"已選 {join_names([i.name for i in self.selection])}，再選一樣物品組合。"
             else:
-                self.held_item = item
-                self.message = f"手上物件：{item.name}"
+                self.message = f"無法組合 {self.held_item.name}和{item.name}"
+                self.held_item = None
+            return
+        obj = self.object_at_screen(pos)
+        if obj:
+            self.message = self.interact(self.held_item, obj)
             return
-        for obj in self.objects:
-            if obj.visible and obj.rect.collidepoint(pos):
-                if self.held_item:
-                    self.message = self.use_item_on(self.held_item, obj)
-                else:
-                    self.message = obj.on_click(self)
-                return
         if self.held_item:
             self.message = "收起了手上物件。"
         self.held_item = None
@@ -550,38 +943,49 @@ class Game:
         if self.show_note_image:
             if key == pygame.K_ESCAPE:
                 self.show_note_image = False
-                player.visible = True
+                self.player.visible = True
             return
         if self.code_panel:
             self.code_panel.handle_key(self, key)
             return
-        if key == pygame.K_ESCAPE:
-            pygame.quit()
-            sys.exit()
+        if key == pygame.K_ESCAPE and self.on_quit:
+            self.on_quit()
         if key == pygame.K_r:
             # 不重置，直接切換房間
             if self.current_room == 1:
                 if self.room_solve:
-                    self.switch_room(2)
+                    self.enter_room(2)
                 else:
                     self.message = "門還鎖著，必須先解開謎題"
             else:
-                self.switch_room(1)
+                self.enter_room(1)
+
+    # 下一次需要 update 是幾個 tick 之後：0 表示有東西在動，要全速更新；
+    # None 表示畫面靜止，只要等輸入
+    def wake_ticks(self) -> int | None:
+        typing = self.message_stage == "main" and len(self.typed_message) < len(self.main_message)
+        if (self.intro or self.player.target or typing or self.message_stage == "intro"
+                or self.shake_frames > 0 or self.postfx.animating or self.was_postfx or self.animating
+                or self.dirty or profiler.show_overlay):
+            return 0
+        if self.dark_room and self.light_map and any(light.flicker for light in self.lights()):
+            return IDLE_FLICKER_TICKS
+        return None
+
+    # 每個 tick 呼叫一次
     def update(self):
-        if not self.eye_done:
-            if self.message_stage == "intro":
-                current_text = self.messages_to_type[self.type_index] if self.type_index < len(self.messages_to_type) else ""
-                if self.type_index < len(self.messages_to_type):
-                    if len(self.typed_message) < len(current_text):
-                        if pygame.time.get_ticks() % self.type_speed == 0:
-                            self.typed_message += current_text[len(self.typed_message)]
-                    else:
-                        self.type_index += 1
-                        self.typed_message = ""
-                else:
-                    self.message_stage = "main"
-                    self.typed_message = ""
-                    self.type_index = 0
+        self.ticks += 1
+        self.postfx.shake = self.get_shake_offset()
+        self.postfx.update()
+        if self.animating:
+            for obj in self.animating:
+                if obj.anim.update(TICK_MS / 1000):
+                    obj.image = obj.anim.image
+            self.animating = [obj for obj in self.animating if not obj.anim.done]
+        if self.intro:
+            self.intro.update()
+            if self.intro.done:
+                self.end_intro()
             return
         if self.message_stage == "main":
             if len(self.typed_message) < len(self.main_message):
@@ -616,26 +1020,164 @@ class Game2(Game):
         axe.desc = "看起來可以用來破壞門或障礙物。"
 
 # 主迴圈
-def main():
-    game = Game()
+# --profile 指定的輸出檔，結束時寫出 Chrome trace（.json）或每幀 CSV
+TRACE_PATH = None
+# --record 指定時，記錄所有輸入，結束時寫進 RECORD_PATH
+RECORDER = None
+RECORD_PATH = None
+# 換房間時自動存檔，F5 手動存檔，F9 讀檔
+SAVE_PATH = "autosave.sav"
+GAME = None
+
+def quit_game():
+    if TRACE_PATH and profiler.trace:
+        profiler.export(TRACE_PATH)
+    if RECORDER:
+        RECORDER.save(RECORD_PATH)
+    if GAME and GAME.autosave:
+        GAME.autosave.flush()
+    pygame.quit()
+    sys.exit()
+
+# 這些鍵作用在整個行程（效能面板、存讀檔），只在 main() 的迴圈處理，不錄進錄影檔；
+# 重播、伺服器送來的同樣按鍵直接忽略，才不會覆寫或讀進玩家的存檔
+HOST_KEYS = {pygame.K_F3, pygame.K_F5, pygame.K_F9}
+
+def handle_host_key(game, event) -> bool:
+    if event.type != pygame.KEYDOWN or event.key not in HOST_KEYS:
+        return False
+    if event.key == pygame.K_F3:
+        profiler.toggle_overlay()
+        game.dirty.add_full()
+    elif event.key == pygame.K_F5:
+        # 和自動存檔排在同一個背景執行緒，不會同時寫同一個檔
+        if game.autosave:
+            game.autosave.save(game.snapshot())
+        else:
+            savegame.save(SAVE_PATH, game.snapshot())
+        game.message = "已存檔。"
+    elif event.key == pygame.K_F9:
+        if game.autosave:
+            game.autosave.flush()
+        if os.path.exists(SAVE_PATH):
+            game.restore(savegame.load(SAVE_PATH))
+    return True
+
+def handle_event(game, event):
+    if event.type == pygame.QUIT:
+        quit_game()
+    elif event.type == pygame.KEYDOWN and event.key in HOST_KEYS:
+        pass
+    elif game.intro and event.type in (pygame.MOUSEBUTTONDOWN, pygame.KEYDOWN):
+        # 開場動畫時按任意鍵或點一下就跳過
+        game.intro.skip()
+    elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+        game.handle_mouse_down(event.pos)
+        if PLAY_RECT.collidepoint(event.pos):
+            game.player.set_path(game.find_path((game.player.x, game.player.y), game.camera.to_world(event.pos)))
+    elif event.type == pygame.MOUSEMOTION:
+        game.update_hover(event.pos)
+    elif event.type == pygame.KEYDOWN:
+        game.handle_key_down(event.key)
+    elif event.type in (pygame.WINDOWEXPOSED, pygame.WINDOWRESTORED, pygame.WINDOWSIZECHANGED):
+        game.dirty.add_full()
+
+# 重新開始一局：人物回到起點
+def new_game(seed=None, prefetch=True):
+    return Game(seed, prefetch)
+
+def tick(game):
+    with profiler.scope("player.update"):
+        game.player.update(TICK_MS / 1000)
+    with profiler.scope("game.update"):
+        game.update()
+
+# 畫一幀，回傳畫過的區域；沒有任何變動時回傳空 list
+def render(game, surf) -> list[pygame.Rect]:
+    if profiler.show_overlay:
+        game.dirty.add(profiler.OVERLAY_RECT)
+    if DIRTY_RECTS:
+        rects = game.collect_dirty()
+        if not rects:
+            return rects
+        surf.set_clip(rects[0].unionall(rects[1:]))
+    else:
+        rects = [surf.get_rect()]
+    if RENDERER:
+        RENDERER.begin_frame()
+    with profiler.scope("game.draw"):
+        game.draw(surf)
+    profiler.draw_overlay(surf, SMALL)
+    surf.set_clip(None)
+    return rects
+
+def main(headless=False, trace_path=None, record_path=None, seed=None, load_path=None,
+         backend="surface", window_size=None):
+    global TRACE_PATH, RECORDER, RECORD_PATH, GAME
+    init(headless, backend, window_size)
+    if trace_path:
+        TRACE_PATH = trace_path
+        profiler.enable(trace=True)
+    if record_path:
+        # 錄製時一定要固定 seed，重播才會一樣
+        from recording import Recorder
+        seed = random.getrandbits(32) if seed is None else seed
+        RECORDER = Recorder(seed)
+        RECORD_PATH = record_path
+    game = GAME = new_game(seed)
+    game.on_quit = quit_game
+    if load_path:
+        game.restore(savegame.load(load_path))
+    game.autosave = savegame.Autosaver(SAVE_PATH)
+    resources.preload(game.preload)
+    accumulator = 0.0
+    clock.tick()
     while True:
-        dt = clock.tick(FPS)
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-            elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
-                game.handle_mouse_down(event.pos)
-                player.set_target(event.pos)
-            elif event.type == pygame.KEYDOWN:
-                game.handle_key_down(event.key)
-
-        player.update(obstacles)  
-        game.update()                 
-        game.draw(screen)        
-        game.draw_eye_animation(screen)
-        player.draw(screen)    
-        pygame.display.flip()
+        accumulator += clock.tick(RENDER_FPS)
+        events = pygame.event.get()
+        wake = game.wake_ticks()
+        if not events and wake != 0:
+            # 沒有東西在動：睡到有輸入或排定的喚醒時間，閒置時不佔 CPU
+            if wake:
+                pygame.time.set_timer(WAKE_EVENT, round(wake * TICK_MS), loops=1)
+            events = [pygame.event.wait()] + pygame.event.get()
+            pygame.time.set_timer(WAKE_EVENT, 0)
+            # 睡著的時間不補 tick；被計時器叫醒時只前進排定的 tick 數
+            clock.tick()
+            woken = any(event.type == WAKE_EVENT for event in events)
+            accumulator = wake * TICK_MS if woken else 0.0
+        for event in events:
+            event = RENDERER.map_event(event)
+            if handle_host_key(game, event):
+                continue
+            if RECORDER:
+                RECORDER.record(game.ticks, event)
+            handle_event(game, event)
+
+        # 累積的時間夠幾個 tick 就更新幾次；落後太多時丟掉多的時間，避免越追越慢
+        steps = 0
+        while accumulator >= TICK_MS and steps < MAX_TICKS_PER_FRAME:
+            tick(game)
+            accumulator -= TICK_MS
+            steps += 1
+        if steps == MAX_TICKS_PER_FRAME:
+            accumulator = 0.0
+        game.player.interpolate(accumulator / TICK_MS)
+        rects = render(game, screen)
+        # 沒有任何變動就不送出畫面，睡到下一個 tick
+        if not rects:
+            pygame.time.wait(int(TICK_MS - accumulator))
+            continue
+        with profiler.scope("present"):
+            RENDERER.present(rects)
+        profiler.end_frame()
 
 if __name__ == "__main__":
-    main()
+    def option(name):
+        return sys.argv[sys.argv.index(name) + 1] if name in sys.argv else None
+    seed = option("--seed")
+    window = option("--window")
+    main(headless="--headless" in sys.argv, trace_path=option("--profile"),
+         record_path=option("--record"), seed=int(seed) if seed is not None else None,
+         load_path=option("--load"), backend=option("--renderer") or "surface",
+         window_size=tuple(int(n) for n in window.split("x")) if window else None)
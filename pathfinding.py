@@ -0,0 +1,155 @@
+import heapq
+import math
+from collections import OrderedDict
+
+import pygame
+
+SQRT2 = math.sqrt(2)
+# 8 個方向：(dx, dy, 成本)
+NEIGHBOURS = [(1, 0, 1), (-1, 0, 1), (0, 1, 1), (0, -1, 1),
+              (1, 1, SQRT2), (1, -1, SQRT2), (-1, 1, SQRT2), (-1, -1, SQRT2)]
+
+
+class NavGrid:
+    # 房間的導航格：設定房間時建立一次，障礙物依人物大小放大後佔到的格子不能走
+    def __init__(self, size, obstacles, cell=10, clearance=(15, 30), cache_size=64):
+        self.cell = cell
+        self.cols = math.ceil(size[0] / cell)
+        self.rows = math.ceil(size[1] / cell)
+        self.blocked = bytearray(self.cols * self.rows)
+        for rect in obstacles:
+            area = pygame.Rect(rect).inflate(clearance[0] * 2, clearance[1] * 2)
+            c0 = max(0, area.left // cell)
+            c1 = min(self.cols - 1, area.right // cell)
+            r0 = max(0, area.top // cell)
+            r1 = min(self.rows - 1, area.bottom // cell)
+            for r in range(r0, r1 + 1):
+                for c in range(c0, c1 + 1):
+                    if area.collidepoint(self.center((c, r))):
+                        self.blocked[r * self.cols + c] = 1
+        self.cache_size = cache_size
+        self._paths: OrderedDict = OrderedDict()
+
+    def cell_of(self, pos):
+        c = min(self.cols - 1, max(0, int(pos[0] // self.cell)))
+        r = min(self.rows - 1, max(0, int(pos[1] // self.cell)))
+        return c, r
+
+    def center(self, cell):
+        return (cell[0] * self.cell + self.cell / 2, cell[1] * self.cell + self.cell / 2)
+
+    def is_free(self, cell):
+        c, r = cell
+        return 0 <= c < self.cols and 0 <= r < self.rows and not self.blocked[r * self.cols + c]
+
+    def nearest_free(self, cell):
+        if self.is_free(cell):
+            return cell
+        # 由近到遠一圈一圈找
+        for radius in range(1, max(self.cols, self.rows)):
+            best = None
+            for dc in range(-radius, radius + 1):
+                for dr in (-radius, radius) if abs(dc) != radius else range(-radius, radius + 1):
+                    candidate = (cell[0] + dc, cell[1] + dr)
+                    if self.is_free(candidate):
+                        d = dc * dc + dr * dr
+                        if best is None or d < best[0]:
+                            best = (d, candidate)
+            if best:
+                return best[1]
+        return None
+
+    def line_of_sight(self, a, b):
+        ax, ay = a
+        bx, by = b
+        steps = int(max(abs(bx - ax), abs(by - ay)) / (self.cell / 2)) + 1
+        for i in range(1, steps + 1):
+            t = i / steps
+            if not self.is_free(self.cell_of((ax + (bx - ax) * t, ay + (by - ay) * t))):
+                return False
+        return True
+
+    def find_path(self, start, goal) -> list[tuple[float, float]]:
+        s = self.nearest_free(self.cell_of(start))
+        goal_cell = self.cell_of(goal)
+        g = self.nearest_free(goal_cell)
+        if s is None or g is None:
+            return []
+        key = (s, g)
+        waypoints = self._paths.get(key)
+        if waypoints is None:
+            waypoints = self._smooth(self._astar(s, g))
+            self._paths[key] = waypoints
+            if len(self._paths) > self.cache_size:
+                self._paths.popitem(last=False)
+        else:
+            self._paths.move_to_end(key)
+        path = list(waypoints)
+        # 點到可以走的地方就走到滑鼠的確切位置
+        if path and g == goal_cell:
+            path[-1] = (goal[0], goal[1])
+        return path
+
+    def _astar(self, s, g):
+        cols, rows = self.cols, self.rows
+        blocked = self.blocked
+        start, goal = s[1] * cols + s[0], g[1] * cols + g[0]
+        gx, gy = g
+        diag = SQRT2 - 1
+        cost = [math.inf] * (cols * rows)
+        came_from = [-1] * (cols * rows)
+        closed = bytearray(cols * rows)
+        cost[start] = 0.0
+        heap = [(0.0, start)]
+        while heap:
+            _, cur = heapq.heappop(heap)
+            if cur == goal:
+                break
+            if closed[cur]:
+                continue
+            closed[cur] = 1
+            r, c = divmod(cur, cols)
+            for dc, dr, step in NEIGHBOURS:
+                nc, nr = c + dc, r + dr
+                if not (0 <= nc < cols and 0 <= nr < rows):
+                    continue
+                nxt = nr * cols + nc
+                if blocked[nxt] or closed[nxt]:
+                    continue
+                # 斜走時不能切過障礙物的角
+                if dc and dr and (blocked[r * cols + nc] or blocked[nr * cols + c]):
+                    continue
+                new_cost = cost[cur] + step
+                if new_cost < cost[nxt]:
+                    cost[nxt] = new_cost
+                    came_from[nxt] = cur
+                    dx, dy = abs(nc - gx), abs(nr - gy)
+                    heuristic = dx + dy + (diag - 1) * min(dx, dy)
+                    heapq.heappush(heap, (new_cost + heuristic, nxt))
+        if start != goal and came_from[goal] < 0:
+            return []
+        cells = []
+        cur = goal
+        while cur != start:
+            cells.append((cur % cols, cur // cols))
+            cur = came_from[cur]
+        cells.append(s)
+        cells.reverse()
+        return cells
+
+    def _smooth(self, cells):
+        # 拉直路徑：從目前的點直接連到看得到的最遠的點
+        if not cells:
+            return ()
+        points = [self.center(c) for c in cells]
+        if len(points) == 1:
+            return (points[0],)
+        smoothed = []
+        i = 0
+        while i < len(points) - 1:
+            j = len(points) - 1
+            while j > i + 1 and not self.line_of_sight(points[i], points[j]):
+                j -= 1
+            smoothed.append(points[j])
+            i = j
+        return tuple(smoothed)
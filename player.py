@@ -1,101 +1,124 @@
 import pygame, math
+from resources import person_frames
+from sprite import AnimatedSprite, Direction
+import profiler
+
+STAND, WALK = 0, 1
+_frame_table = None
+
+
+def frame_table():
+    # [狀態][方向] -> 圖片，方向照 Direction 的順序；所有 Player 共用
+    global _frame_table
+    if _frame_table is None:
+        frames = person_frames()
+        frames["stand"][0].set_colorkey((35, 38, 47))
+        stand = [frames["stand"], frames["right"][1:2], frames["up"][1:2], frames["left"][1:2]]
+        walk = [frames["down"], frames["right"], frames["up"], frames["left"]]
+        _frame_table = [stand, walk]
+    return _frame_table
 
 
 class Player:
-    def __init__(self, x, y):
-        #載入圖片
+    def __init__(self, x, y, visible=True):
+        #載入圖片（所有 Player 共用同一張圖集）
         super().__init__()
-        self.stand_image = pygame.image.load("assets/person1.png").convert_alpha()
-        self.stand_image.set_colorkey((35, 38, 47))
-        walk_images = [
-            pygame.image.load("assets/person2.png").convert_alpha(),
-            pygame.image.load("assets/person3.png").convert_alpha(),
-            pygame.image.load("assets/person4.png").convert_alpha()
-        ]
-        walk_right_images = [
-            pygame.image.load("assets/person6.png").convert_alpha(),
-            pygame.image.load("assets/person5.png").convert_alpha(),
-            pygame.image.load("assets/person8.png").convert_alpha()
-        ]
-        walk_up_images = [
-            pygame.image.load("assets/person10.png").convert_alpha(),
-            pygame.image.load("assets/person9.png").convert_alpha(),
-            pygame.image.load("assets/person12.png").convert_alpha()
-        ]
-
-        walk_left_images = [
-            pygame.image.load("assets/person14.png").convert_alpha(),
-            pygame.image.load("assets/person13.png").convert_alpha(),
-            pygame.image.load("assets/person16.png").convert_alpha()
-        ]
-        self.stand_image = pygame.transform.scale(self.stand_image, (30, 60))
-        self.walk_images = [pygame.transform.scale(img, (30, 60)) for img in walk_images]
-        self.walk_right_images = [pygame.transform.scale(img, (30, 60)) for img in walk_right_images]
-        self.walk_up_images = [pygame.transform.scale(img, (30, 60)) for img in walk_up_images]
-        self.walk_left_images = [pygame.transform.scale(img, (30, 60)) for img in walk_left_images]
 
         #初始位置
         self.x = x
         self.y = y
+        #上一個 tick 的位置與畫面上插值後的位置
+        self.prev_x = x
+        self.prev_y = y
+        self.render_x = x
+        self.render_y = y
         self.speed = 2
+        self.visible = visible
         
-        #滑鼠點擊的位置
+        #滑鼠點擊的位置，以及之後還要經過的路徑點
         self.target = None
+        self.path = []
+        #往目前路徑點每個 tick 的位移，以及剩下的距離（換路徑點時才算一次）
+        self.vx = 0.0
+        self.vy = 0.0
+        self.remaining = 0.0
         
-        #動畫控制
-        self.current_frame = 0
-        self.animation_timer = 0
-        self.animation_speed = 0.15
-        self.direction = "right"
+        #動畫控制：走路時每秒換 9 張
+        self.sprite = AnimatedSprite(frame_table(), fps=9, state=STAND, direction=Direction.RIGHT)
 
-    def update(self):
-        if self.target:
-            dx = self.target[0] - self.x
-            dy = self.target[1] - self.y
-            dist = math.hypot(dx, dy)
+        #上一次畫出的位置，用來回報需要重畫的區域
+        self.drawn_state = None
+        self.drawn_rect = None
 
-            if dist > self.speed:
-                self.x += self.speed * dx / dist
-                self.y += self.speed * dy / dist
-
-                #判斷方向
-                if abs(dx) > abs(dy):
-                    self.direction = "right" if dx > 0 else "left"
-                else:
-                    self.direction = "down" if dy > 0 else "up"
-
-                self.animation_timer += self.animation_speed
-                if self.animation_timer >= 1:
-                    self.animation_timer = 0
-                    self.current_frame = (self.current_frame + 1) % 3
+    #每個 tick 呼叫一次，dt 是一個 tick 的秒數
+    def update(self, dt=1 / 60):
+        self.prev_x = self.x
+        self.prev_y = self.y
+        if self.target:
+            if self.remaining > self.speed:
+                self.x += self.vx
+                self.y += self.vy
+                self.remaining -= self.speed
+                self.sprite.update(dt)
             else:
                 self.x, self.y = self.target
+                if self.path:
+                    self.begin_segment(self.path.pop(0))
+                    return
                 self.target = None
-                self.current_frame = 0
-                self.animation_timer = 0
-    
-    def draw(self,screen):
-        if self.target:
-            if self.direction == "down":
-                img = self.walk_images[self.current_frame]
-            elif self.direction == "right":
-                img = self.walk_right_images[self.current_frame]
-            elif self.direction == "up":
-                img = self.walk_up_images[self.current_frame]
-            elif self.direction == "left":
-                img = self.walk_left_images[self.current_frame]
-        else:
-            if self.direction == "down":
-                img = self.stand_image
-            elif self.direction == "up":
-                img = self.walk_up_images[1]
-            elif self.direction == "left":
-                img = self.walk_left_images[1]
+                self.sprite.play(STAND)
+
+    def begin_segment(self, target):
+        self.target = target
+        dx = target[0] - self.x
+        dy = target[1] - self.y
+        dist = math.hypot(dx, dy)
+        self.remaining = dist
+        if dist > self.speed:
+            self.vx = self.speed * dx / dist
+            self.vy = self.speed * dy / dist
+            #判斷方向
+            if abs(dx) > abs(dy):
+                self.sprite.face(Direction.RIGHT if dx > 0 else Direction.LEFT)
             else:
-                img = self.walk_right_images[1]
+                self.sprite.face(Direction.DOWN if dy > 0 else Direction.UP)
+        self.sprite.play(WALK)
+    
+    #alpha 是距離上一個 tick 過了多少比例
+    def interpolate(self, alpha):
+        self.render_x = self.prev_x + (self.x - self.prev_x) * alpha
+        self.render_y = self.prev_y + (self.y - self.prev_y) * alpha
 
-        rect = img.get_rect(center = (self.x, self.y))
+    def current_image(self):
+        return self.sprite.image
+
+    #offset 是世界座標換成畫面座標的位移（見 Camera.offset）
+    def dirty_rect(self, offset=(0, 0)):
+        img = self.current_image()
+        rect = img.get_rect(center = (round(self.render_x) + offset[0], round(self.render_y) + offset[1]))
+        state = (self.visible, rect.topleft, img)
+        if state == self.drawn_state:
+            return None
+        dirty = rect if self.drawn_rect is None else rect.union(self.drawn_rect)
+        self.drawn_state = state
+        self.drawn_rect = rect
+        return dirty
+
+    def draw(self,screen, offset=(0, 0)):
+        if not self.visible:
+            return
+        img = self.current_image()
+        rect = img.get_rect(center = (round(self.render_x) + offset[0], round(self.render_y) + offset[1]))
         screen.blit(img, rect)
+        profiler.count("blits")
 
     def set_target(self, pos):
-        self.target = pos
+        self.set_path([pos])
+
+    def set_path(self, points):
+        self.path = list(points)
+        if self.path:
+            self.begin_segment(self.path.pop(0))
+        else:
+            self.target = None
+            self.sprite.play(STAND)
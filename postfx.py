@@ -0,0 +1,92 @@
+import pygame
+
+import profiler
+
+
+class PostFX:
+    # 後製：有效果時場景先畫到離屏的 target，再依序套用交叉淡化、淡入淡出、震動，
+    # 最後一次貼到畫面上。沒有效果時 begin 直接回傳畫面，完全不多花一次 blit。
+    # 緩衝區第一次用到時才建立，之後重複使用
+    def __init__(self, size):
+        self.size = size
+        self.target: pygame.Surface | None = None
+        # 交叉淡化時換房間前的畫面
+        self.previous: pygame.Surface | None = None
+        # 淡入用的全黑圖，用整張的 alpha 貼上去（比 BLEND_MULT 的 fill 快很多）
+        self.black: pygame.Surface | None = None
+        self.capture = False
+        self.shake = (0, 0)
+        # 黑色的不透明度（0~255）與每個 tick 減少多少
+        self.fade = 0
+        self.fade_step = 0
+        # 舊畫面剩下的不透明度與每個 tick 減少多少
+        self.crossfade = 0
+        self.crossfade_step = 0
+
+    @property
+    def active(self) -> bool:
+        return self.shake != (0, 0) or self.fade > 0 or self.crossfade > 0 or self.capture
+
+    @property
+    def animating(self) -> bool:
+        return self.fade > 0 or self.crossfade > 0 or self.capture
+
+    def fade_in(self, ticks, alpha=255):
+        self.fade = alpha
+        self.fade_step = max(1, alpha // ticks)
+
+    # 下一幀開始前先把畫面上的舊畫面存起來，再慢慢淡出
+    def cross_fade(self, ticks):
+        self.capture = True
+        self.crossfade = 255
+        self.crossfade_step = max(1, 255 // ticks)
+
+    def reset(self):
+        self.capture = False
+        self.shake = (0, 0)
+        self.fade = self.crossfade = 0
+
+    # 每個 tick 呼叫一次
+    def update(self):
+        if self.fade > 0:
+            self.fade = max(0, self.fade - self.fade_step)
+        if self.crossfade > 0 and not self.capture:
+            self.crossfade = max(0, self.crossfade - self.crossfade_step)
+
+    # 回傳這一幀場景要畫在哪裡
+    def begin(self, surf) -> pygame.Surface:
+        if self.capture:
+            if self.previous is None:
+                self.previous = pygame.Surface(self.size)
+            self.previous.blit(surf, (0, 0))
+            self.capture = False
+        if not self.active:
+            return surf
+        if self.target is None:
+            self.target = pygame.Surface(self.size)
+        self.target.set_clip(surf.get_clip())
+        return self.target
+
+    def finish(self, surf):
+        target = self.target
+        if not self.active or target is None:
+            return
+        if self.crossfade > 0:
+            self.previous.set_alpha(self.crossfade)
+            target.blit(self.previous, (0, 0))
+            profiler.count("blits")
+        if self.fade > 0:
+            if self.black is None:
+                self.black = pygame.Surface(self.size)
+            self.black.set_alpha(self.fade)
+            target.blit(self.black, (0, 0))
+            profiler.count("blits")
+        dx, dy = self.shake
+        if dx or dy:
+            # 震動時露出來的邊填黑色，不是拖出殘影
+            w, h = self.size
+            surf.fill((0, 0, 0), (0 if dx > 0 else w + dx, 0, abs(dx), h))
+            surf.fill((0, 0, 0), (0, 0 if dy > 0 else h + dy, w, abs(dy)))
+        surf.blit(target, self.shake)
+        target.set_clip(None)
+        profiler.count("blits")
@@ -0,0 +1,181 @@
+import csv
+import json
+import time
+from collections import defaultdict, deque
+
+import pygame
+
+# 預設關閉；關閉時 scope() 回傳共用的空 context manager，count() 只檢查一個旗標
+enabled = False
+show_overlay = False
+# --profile 錄製中：關掉 F3 面板時不停止取樣
+tracing = False
+HISTORY = 240
+MAX_TRACE_EVENTS = 200_000
+
+_frame_scopes: dict[str, float] = defaultdict(float)
+_frame_counts: dict[str, int] = defaultdict(int)
+counters = {"surfaces"}
+_frame_start = 0.0
+# 每個 scope、每個計數器最近 HISTORY 幀的數值
+history: dict[str, deque] = defaultdict(lambda: deque(maxlen=HISTORY))
+frame_times: deque = deque(maxlen=HISTORY)
+frames: deque = deque(maxlen=MAX_TRACE_EVENTS // 8)
+trace: deque = deque(maxlen=MAX_TRACE_EVENTS)
+_real_surface = pygame.Surface
+
+
+class CountingSurface(pygame.Surface):
+    # 計算 pygame.Surface(...) 被呼叫了幾次（font.render 等 C 函式建立的不算）
+    created = 0
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        CountingSurface.created += 1
+
+
+def install_surface_counter():
+    pygame.Surface = CountingSurface
+
+
+def uninstall_surface_counter():
+    pygame.Surface = _real_surface
+
+
+class _NullScope:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL = _NullScope()
+
+
+class _Scope:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        _frame_scopes[self.name] += end - self.start
+        trace.append((self.name, self.start, end - self.start))
+        return False
+
+
+def scope(name):
+    return _Scope(name) if enabled else _NULL
+
+
+def count(name, n=1):
+    if enabled:
+        _frame_counts[name] += n
+        counters.add(name)
+
+
+def enable(trace=False):
+    global enabled, tracing, _frame_start
+    tracing = tracing or trace
+    if enabled:
+        return
+    enabled = True
+    _frame_start = time.perf_counter()
+    CountingSurface.created = 0
+    install_surface_counter()
+
+
+def disable():
+    global enabled, show_overlay, tracing
+    enabled = False
+    tracing = False
+    show_overlay = False
+    uninstall_surface_counter()
+
+
+def toggle_overlay():
+    global show_overlay
+    show_overlay = not show_overlay
+    if show_overlay:
+        enable()
+    elif not tracing:
+        disable()
+
+
+def end_frame():
+    global _frame_start
+    if not enabled:
+        return
+    now = time.perf_counter()
+    frame_time = now - _frame_start
+    _frame_start = now
+    _frame_counts["surfaces"] += CountingSurface.created
+    CountingSurface.created = 0
+    frame_times.append(frame_time)
+    row = {"frame_ms": frame_time * 1000}
+    for name, total in _frame_scopes.items():
+        history[name].append(total)
+        row[name] = total * 1000
+    for name, n in _frame_counts.items():
+        history[name].append(n)
+        row[name] = n
+    frames.append(row)
+    _frame_scopes.clear()
+    _frame_counts.clear()
+
+
+def average(name):
+    values = history.get(name)
+    return sum(values) / len(values) if values else 0.0
+
+
+def export(path):
+    # .json 輸出 Chrome trace（chrome://tracing、Perfetto 可開），其他副檔名輸出每幀的 CSV
+    if path.endswith(".json"):
+        events = [{"name": name, "ph": "X", "ts": start * 1e6, "dur": dur * 1e6, "pid": 0, "tid": 0}
+                  for name, start, dur in trace]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events}, f)
+        return
+    columns = ["frame_ms"] + sorted({key for row in frames for key in row} - {"frame_ms"})
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=columns, restval=0)
+        writer.writeheader()
+        writer.writerows(frames)
+
+
+OVERLAY_RECT = pygame.Rect(8, 8, 260, 150)
+
+
+def draw_overlay(surf, font):
+    # F3 面板：FPS、最近幾幀的時間曲線、每幀新建的 Surface 與 blit 次數、各 scope 的平均時間
+    if not show_overlay:
+        return
+    rect = OVERLAY_RECT
+    pygame.draw.rect(surf, (0, 0, 0), rect)
+    avg_frame = sum(frame_times) / len(frame_times) if frame_times else 0.0
+    lines = [
+        f"FPS {1 / avg_frame:.0f}  frame {avg_frame * 1000:.2f} ms" if avg_frame else "FPS -",
+        f"surfaces {average('surfaces'):.1f}  blits {average('blits'):.1f}",
+    ]
+    scopes = sorted((name for name in history if name not in counters), key=average, reverse=True)
+    for name in scopes[:4]:
+        lines.append(f"{name} {average(name) * 1000:.3f} ms")
+    y = rect.y + 4
+    for line in lines:
+        surf.blit(font.render(line, True, (0, 255, 0)), (rect.x + 6, y))
+        y += font.get_linesize()
+    # 每一條直線是一幀，滿格是 33 ms
+    graph_bottom = rect.bottom - 4
+    x = rect.right - 4 - len(frame_times)
+    for t in frame_times:
+        h = min(40, int(t * 1000 / 33 * 40))
+        color = (0, 200, 0) if t < 1 / 60 else (230, 180, 0) if t < 1 / 30 else (230, 60, 60)
+        pygame.draw.line(surf, color, (x, graph_bottom), (x, graph_bottom - h))
+        x += 1
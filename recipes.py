@@ -0,0 +1,52 @@
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class Recipe:
+    inputs: frozenset
+    outputs: tuple
+    message: str = ""
+
+
+class RecipeBook:
+    # 組合表：以材料集合為 key 查配方，另外記每個材料出現在哪些配方裡，
+    # 拿著一個物品時可以直接查出還能和哪些物品組合
+    def __init__(self, specs: list[dict]):
+        self.recipes: dict[frozenset, Recipe] = {}
+        self.by_ingredient: dict[str, list[Recipe]] = {}
+        for spec in specs:
+            inputs = frozenset(spec["in"])
+            if len(inputs) != len(spec["in"]) or len(inputs) < 2:
+                raise ValueError(f"組合至少要兩個不同的物品：{spec['in']}")
+            if inputs in self.recipes:
+                raise ValueError(f"重複的組合：{sorted(inputs)}")
+            recipe = Recipe(inputs, tuple(spec["out"]), spec.get("message", ""))
+            self.recipes[inputs] = recipe
+            for item_id in inputs:
+                self.by_ingredient.setdefault(item_id, []).append(recipe)
+
+    def items(self):
+        return {i for recipe in self.recipes.values() for i in recipe.inputs | set(recipe.outputs)}
+
+    def match(self, item_ids) -> Recipe | None:
+        return self.recipes.get(frozenset(item_ids))
+
+    # 已選的物品還能再加哪些物品（至少有一個配方包含全部已選的物品）
+    def partners(self, item_ids) -> frozenset:
+        selected = frozenset(item_ids)
+        first = next(iter(selected), None)
+        result = set()
+        for recipe in self.by_ingredient.get(first, ()):
+            if selected <= recipe.inputs:
+                result |= recipe.inputs - selected
+        return frozenset(result)
+
+    # 物品欄裡的材料湊得齊的配方
+    def available(self, item_ids):
+        have = set(item_ids)
+        seen = set()
+        for item_id in have:
+            for recipe in self.by_ingredient.get(item_id, ()):
+                if recipe.inputs not in seen and recipe.inputs <= have:
+                    seen.add(recipe.inputs)
+                    yield recipe
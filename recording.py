@@ -0,0 +1,153 @@
+import struct
+import sys
+import time
+
+import pygame
+
+import main
+
+# 錄影檔格式：
+#   檔頭  b"ERR1" + seed（u32）
+#   每筆  tick 差（varint）+ 類型（1 byte）+ 內容
+#         MOTION / CLICK：x, y（i16，視窗放大置中時點在畫面外會是負的）；CLICK 後面再接 button（1 byte）
+#         KEY：key code（varint）
+MAGIC = b"ERR1"
+MOTION, CLICK, KEY, QUIT = range(4)
+
+
+class Recorder:
+    # 只記會影響遊戲狀態的輸入；同一個 tick 的滑鼠移動只留最後一筆
+    def __init__(self, seed):
+        self.seed = seed
+        self.events: list[tuple] = []
+
+    def record(self, ticks, event):
+        if event.type == pygame.MOUSEMOTION:
+            if self.events and self.events[-1][:2] == (ticks, MOTION):
+                self.events.pop()
+            self.events.append((ticks, MOTION, *event.pos))
+        elif event.type == pygame.MOUSEBUTTONDOWN:
+            self.events.append((ticks, CLICK, *event.pos, event.button))
+        elif event.type == pygame.KEYDOWN:
+            self.events.append((ticks, KEY, event.key))
+        elif event.type == pygame.QUIT:
+            self.events.append((ticks, QUIT))
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(encode(self.seed, self.events))
+
+
+def _varint(n):
+    out = bytearray()
+    while True:
+        byte = n & 0x7F
+        n >>= 7
+        if n:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return out
+
+
+def _read_varint(data, i):
+    n = shift = 0
+    while True:
+        byte = data[i]
+        i += 1
+        n |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return n, i
+        shift += 7
+
+
+def encode(seed, events):
+    out = bytearray(MAGIC)
+    out += struct.pack("<I", seed & 0xFFFFFFFF)
+    last = 0
+    for ticks, kind, *args in events:
+        out += _varint(ticks - last)
+        out.append(kind)
+        last = ticks
+        if kind in (MOTION, CLICK):
+            out += struct.pack("<hh", args[0], args[1])
+            if kind == CLICK:
+                out.append(args[2])
+        elif kind == KEY:
+            out += _varint(args[0])
+    return bytes(out)
+
+
+def decode(data):
+    if data[:4] != MAGIC:
+        raise ValueError("不是錄影檔")
+    seed = struct.unpack_from("<I", data, 4)[0]
+    events = []
+    i = 8
+    ticks = 0
+    while i < len(data):
+        delta, i = _read_varint(data, i)
+        ticks += delta
+        kind = data[i]
+        i += 1
+        if kind in (MOTION, CLICK):
+            x, y = struct.unpack_from("<hh", data, i)
+            i += 4
+            if kind == CLICK:
+                events.append((ticks, kind, x, y, data[i]))
+                i += 1
+            else:
+                events.append((ticks, kind, x, y))
+        elif kind == KEY:
+            key, i = _read_varint(data, i)
+            events.append((ticks, kind, key))
+        else:
+            events.append((ticks, kind))
+    return seed, events
+
+
+def load(path):
+    with open(path, "rb") as f:
+        return decode(f.read())
+
+
+def to_event(kind, *args):
+    if kind == MOTION:
+        return pygame.event.Event(pygame.MOUSEMOTION, pos=args, rel=(0, 0), buttons=(0, 0, 0))
+    if kind == CLICK:
+        return pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=args[:2], button=args[2])
+    if kind == KEY:
+        return pygame.event.Event(pygame.KEYDOWN, key=args[0])
+    return None
+
+
+def replay(game, events, render_every=0):
+    # 不等時鐘，全速把每個輸入送到錄下來的 tick；render_every 為 0 時完全不畫
+    i = 0
+    frames = 0
+    while i < len(events):
+        while i < len(events) and events[i][0] <= game.ticks:
+            _, kind, *args = events[i]
+            i += 1
+            if kind == QUIT:
+                return game
+            main.handle_event(game, to_event(kind, *args))
+        main.tick(game)
+        frames += 1
+        if render_every and frames % render_every == 0:
+            game.player.interpolate(1.0)
+            main.render(game, main.screen)
+    return game
+
+
+if __name__ == "__main__":
+    # python recording.py 錄影檔 [--render N]
+    main.init(headless=True)
+    render_every = int(sys.argv[sys.argv.index("--render") + 1]) if "--render" in sys.argv else 0
+    seed, events = load(sys.argv[1])
+    game = main.new_game(seed)
+    start = time.perf_counter()
+    replay(game, events, render_every)
+    elapsed = time.perf_counter() - start
+    print(f"房間 {game.current_room}，通關：{game.win}，訊息：{game.message}")
+    print(f"{game.ticks} tick，{elapsed:.2f} 秒（{game.ticks / max(elapsed, 1e-9):.0f} tick/s）")
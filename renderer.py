@@ -0,0 +1,123 @@
+import pygame
+
+import profiler
+from surfaces import get_overlay
+
+# pygame._sdl2 是選用的；沒有時只能用 SurfaceRenderer
+try:
+    from pygame._sdl2 import video
+except ImportError:
+    video = None
+
+available = video is not None
+BLEND = 1
+KINDS = ("surface", "texture", "software")
+
+
+class SurfaceRenderer:
+    # 原本的作法：遊戲直接畫在 display surface 上，display.update 只送出有變動的區域
+    def __init__(self, size, caption=""):
+        self.size = size
+        self.surface = pygame.display.set_mode(size)
+        pygame.display.set_caption(caption)
+
+    def begin_frame(self):
+        pass
+
+    # 全畫面的半透明遮罩；回傳之後的內容要畫在哪裡
+    def dim(self, surf, alpha) -> pygame.Surface:
+        surf.blit(get_overlay(self.size, (0, 0, 0, alpha)), (0, 0))
+        profiler.count("blits")
+        return surf
+
+    def map_event(self, event):
+        return event
+
+    def present(self, rects):
+        pygame.display.update(rects)
+
+
+class TextureRenderer:
+    # 用 SDL 的 Renderer / Texture 合成畫面。遊戲照樣畫在軟體的 frame 上（烘焙圖層、
+    # 只重畫變動區域都不變），每幀只把變動的區域上傳到串流貼圖；
+    # 全畫面的半透明遮罩由 GPU 畫，遮罩上面的內容（便條紙、密碼面板）另外畫在 overlay 上。
+    # 視窗可以是任意大小，畫面以整數倍放大置中，縮放也是 GPU 做。
+    # software=True 用 SDL 的軟體 renderer，沒有 GPU 的機器也能測
+    def __init__(self, size, caption="", window_size=None, software=False):
+        self.size = size
+        # convert_alpha 需要 display 模式，開一個看不到的 1x1 視窗
+        pygame.display.set_mode((1, 1), pygame.HIDDEN)
+        self.window = video.Window(caption, window_size or size, resizable=True)
+        self.renderer = video.Renderer(self.window, accelerated=0 if software else -1)
+        self.surface = pygame.Surface(size)
+        self.overlay = pygame.Surface(size, pygame.SRCALPHA)
+        self.frame_texture = video.Texture(self.renderer, size, streaming=True)
+        self.overlay_texture = video.Texture(self.renderer, size, streaming=True)
+        self.overlay_texture.blend_mode = BLEND
+        # 這一幀遮罩的不透明度，0 表示沒有遮罩
+        self.alpha = 0
+        self.dest = self.viewport()
+
+    # 畫面在視窗裡的位置：最大的整數倍放大，置中
+    def viewport(self) -> pygame.Rect:
+        w, h = self.size
+        ww, wh = self.window.size
+        scale = max(1, min(ww // w, wh // h))
+        rect = pygame.Rect(0, 0, w * scale, h * scale)
+        rect.center = (ww // 2, wh // 2)
+        return rect
+
+    def begin_frame(self):
+        self.alpha = 0
+
+    def dim(self, surf, alpha) -> pygame.Surface:
+        if surf is self.surface and self.alpha:
+            # 同一幀的第二層遮罩疊在 overlay 上，才會蓋住第一層上面的內容
+            surf = self.overlay
+        if surf is not self.surface:
+            surf.blit(get_overlay(self.size, (0, 0, 0, alpha)), (0, 0))
+            profiler.count("blits")
+            return surf
+        self.alpha = alpha
+        self.overlay.set_clip(surf.get_clip())
+        self.overlay.fill((0, 0, 0, 0))
+        return self.overlay
+
+    # 滑鼠座標從視窗換成遊戲畫面的座標；關掉視窗當成結束遊戲
+    def map_event(self, event):
+        if event.type == pygame.WINDOWCLOSE:
+            return pygame.event.Event(pygame.QUIT)
+        if event.type in (pygame.MOUSEMOTION, pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP):
+            scale = self.dest.width // self.size[0]
+            pos = ((event.pos[0] - self.dest.x) // scale, (event.pos[1] - self.dest.y) // scale)
+            return pygame.event.Event(event.type, {**event.dict, "pos": pos})
+        if event.type == pygame.WINDOWSIZECHANGED:
+            self.dest = self.viewport()
+        return event
+
+    def present(self, rects):
+        with profiler.scope("upload"):
+            for rect in rects:
+                self.frame_texture.update(self.surface.subsurface(rect), rect)
+                if self.alpha:
+                    self.overlay_texture.update(self.overlay.subsurface(rect), rect)
+        self.overlay.set_clip(None)
+        renderer = self.renderer
+        renderer.draw_color = (0, 0, 0, 255)
+        renderer.clear()
+        self.frame_texture.draw(dstrect=self.dest)
+        if self.alpha:
+            renderer.draw_blend_mode = BLEND
+            renderer.draw_color = (0, 0, 0, self.alpha)
+            renderer.fill_rect(self.dest)
+            self.overlay_texture.draw(dstrect=self.dest)
+        renderer.present()
+
+
+def create(kind, size, caption="", window_size=None) -> SurfaceRenderer | TextureRenderer:
+    # kind："surface"（預設）、"texture"（GPU）、"software"（SDL 軟體 renderer）
+    if kind not in KINDS:
+        raise ValueError(f"未知的 renderer：{kind}（可用：{'、'.join(KINDS)}）")
+    if kind == "surface" or not available:
+        return SurfaceRenderer(size, caption)
+    return TextureRenderer(size, caption, window_size, software=kind == "software")
@@ -0,0 +1,54 @@
+import json
+import sys
+
+import pygame
+
+import main
+
+
+# 腳本格式：JSON list，每一步是下列其中一種
+#   {"wait": 60}          跑 60 個 tick
+#   {"move": [x, y]}      滑鼠移到 (x, y)
+#   {"click": [x, y]}     在 (x, y) 按下左鍵
+#   {"key": "return"}     按一個鍵（pygame.key.key_code 的名稱）
+def load_script(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def step_events(step):
+    if "move" in step:
+        pos = tuple(step["move"])
+        return [pygame.event.Event(pygame.MOUSEMOTION, pos=pos, rel=(0, 0), buttons=(0, 0, 0))]
+    if "click" in step:
+        pos = tuple(step["click"])
+        return [pygame.event.Event(pygame.MOUSEMOTION, pos=pos, rel=(0, 0), buttons=(0, 0, 0)),
+                pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=pos, button=1)]
+    if "key" in step:
+        return [pygame.event.Event(pygame.KEYDOWN, key=pygame.key.key_code(step["key"]))]
+    return []
+
+
+def advance(game, render=True):
+    main.tick(game)
+    game.player.interpolate(1.0)
+    if render:
+        main.render(game, main.screen)
+
+
+def run_script(game, steps, frame=None):
+    # 依序送出腳本的輸入，每送一次輸入或等一個 tick 都呼叫一次 frame()
+    frame = frame or (lambda: advance(game))
+    for step in steps:
+        for event in step_events(step):
+            main.handle_event(game, event)
+        for _ in range(step.get("wait", 1)):
+            frame()
+
+
+if __name__ == "__main__":
+    main.init(headless="--headless" in sys.argv)
+    game = main.new_game(seed=0)
+    paths = [a for a in sys.argv[1:] if not a.startswith("--")]
+    run_script(game, load_script(paths[0] if paths else "playthroughs/default.json"))
+    print(f"房間 {game.current_room}，通關：{game.win}，訊息：{game.message}")
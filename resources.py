@@ -0,0 +1,188 @@
+import hashlib
+import json
+import os
+import sys
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import pygame
+
+ASSET_DIR = "assets"
+# 找到的字型路徑、縮放好的圖片存在這裡，依原始檔的修改時間判斷是否還能用
+CACHE_DIR = ".cache"
+CACHE_INDEX = os.path.join(CACHE_DIR, "index.json")
+FONT_NAME = "Microsoft JhengHei"
+PERSON_SIZE = (30, 60)
+# 人物動畫每個方向用到的圖片
+PERSON_FRAMES = {
+    "stand": ["person1.png"],
+    "down": ["person2.png", "person3.png", "person4.png"],
+    "right": ["person6.png", "person5.png", "person8.png"],
+    "up": ["person10.png", "person9.png", "person12.png"],
+    "left": ["person14.png", "person13.png", "person16.png"],
+}
+
+_images: dict[tuple, pygame.Surface] = {}
+_fonts: dict[tuple, pygame.font.Font] = {}
+# 這次執行已經查過的字型路徑（包含找不到的 None），每次啟動只查一次、只警告一次
+_font_paths: dict[str, str | None] = {}
+_person_frames: dict[str, list[pygame.Surface]] | None = None
+person_atlas: pygame.Surface | None = None
+_index: dict | None = None
+# 背景載入和主執行緒可能同時要同一份資源，讀寫快取時都要拿這個鎖
+_lock = threading.RLock()
+_loader: ThreadPoolExecutor | None = None
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _cache_index() -> dict:
+    global _index
+    if _index is None:
+        try:
+            with open(CACHE_INDEX, encoding="utf-8") as f:
+                _index = json.load(f)
+        except (OSError, ValueError):
+            _index = {}
+    return _index
+
+
+def _save_index():
+    # 和存檔一樣先寫暫存檔再換名；快取寫不進去（唯讀目錄）就算了，下次重建
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp = f"{CACHE_INDEX}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(_index, f, ensure_ascii=False)
+        os.replace(tmp, CACHE_INDEX)
+    except OSError:
+        pass
+
+
+def font_path(name=FONT_NAME) -> str | None:
+    # 搜尋系統字型（Linux 上會跑 fc-list）很慢，找到的路徑記在快取裡，
+    # 之後只要確認檔案沒變。找不到的字型不寫進快取，下次啟動會重找（也會再警告），
+    # 裝了新字型就會用上
+    with _lock:
+        if name in _font_paths:
+            return _font_paths[name]
+        _font_paths[name] = path = _find_font(name)
+        return path
+
+
+def _find_font(name) -> str | None:
+    # 呼叫端（font_path）已經拿著 _lock
+    index = _cache_index()
+    key = f"font:{name}"
+    entry = index.get(key)
+    if entry and entry["path"] and _mtime(entry["path"]) == entry["mtime"]:
+        return entry["path"]
+    path = pygame.font.match_font(name)
+    if path is None:
+        print(f"找不到字型 {name}，改用 pygame 內建字型（中文可能無法顯示）", file=sys.stderr)
+        if index.pop(key, None):
+            _save_index()
+        return None
+    index[key] = {"path": path, "mtime": _mtime(path)}
+    _save_index()
+    return path
+
+
+def font(size, name=FONT_NAME) -> pygame.font.Font:
+    key = (name, size)
+    f = _fonts.get(key)
+    if f is None:
+        f = _fonts[key] = pygame.font.Font(font_path(name), size)
+    return f
+
+
+def cached_surface(key, sources, build) -> pygame.Surface:
+    # build() 做出來的圖（縮放、拼圖集）以 RGBA 原始資料存到硬碟，
+    # 只要 sources 的修改時間沒變，下次直接讀回來，不必解碼 PNG 再縮放
+    with _lock:
+        index = _cache_index()
+        stamp = [_mtime(path) for path in sources]
+        path = os.path.join(CACHE_DIR, hashlib.sha1(key.encode()).hexdigest()[:16] + ".rgba")
+        entry = index.get(key)
+        if entry and entry["stamp"] == stamp:
+            try:
+                with open(path, "rb") as f:
+                    return pygame.image.frombytes(f.read(), entry["size"], "RGBA").convert_alpha()
+            except (OSError, ValueError):
+                pass
+        img = build()
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(pygame.image.tobytes(img, "RGBA"))
+        except OSError:
+            return img
+        index[key] = {"stamp": stamp, "size": img.get_size()}
+        _save_index()
+        return img
+
+
+def load_image(name, size=None, smooth=False) -> pygame.Surface:
+    # 同一張圖、同一個尺寸只從硬碟讀一次；要縮放的圖縮好後存進快取
+    key = (name, size, smooth)
+    with _lock:
+        img = _images.get(key)
+        if img is None:
+            path = os.path.join(ASSET_DIR, name)
+            if size:
+                scale = pygame.transform.smoothscale if smooth else pygame.transform.scale
+                build = lambda: scale(pygame.image.load(path).convert_alpha(), size)
+                img = cached_surface(f"image:{name}:{size[0]}x{size[1]}:{smooth}", [path], build)
+            else:
+                img = pygame.image.load(path).convert_alpha()
+            _images[key] = img
+        return img
+
+
+def _build_person_atlas() -> pygame.Surface:
+    w, h = PERSON_SIZE
+    count = sum(len(names) for names in PERSON_FRAMES.values())
+    atlas = pygame.Surface((w * count, h), pygame.SRCALPHA)
+    x = 0
+    for names in PERSON_FRAMES.values():
+        for name in names:
+            img = pygame.transform.scale(
+                pygame.image.load(os.path.join(ASSET_DIR, name)).convert_alpha(), PERSON_SIZE)
+            # 圖集一開始是全透明，用 MAX 混合等於直接複製像素
+            atlas.blit(img, (x, 0), special_flags=pygame.BLEND_RGBA_MAX)
+            x += w
+    return atlas
+
+
+def person_frames() -> dict[str, list[pygame.Surface]]:
+    # 所有人物圖片縮放後排成一列，拼成一張圖集（存在快取裡），
+    # 每一格用 subsurface 交給 Player，所有 Player 共用同一份
+    global _person_frames, person_atlas
+    with _lock:
+        if _person_frames is not None:
+            return _person_frames
+        w, h = PERSON_SIZE
+        sources = [os.path.join(ASSET_DIR, name) for names in PERSON_FRAMES.values() for name in names]
+        person_atlas = cached_surface(f"person_atlas:{w}x{h}", sources, _build_person_atlas)
+        frames = {}
+        x = 0
+        for direction, names in PERSON_FRAMES.items():
+            frames[direction] = []
+            for _ in names:
+                frames[direction].append(person_atlas.subsurface((x, 0, w, h)))
+                x += w
+        _person_frames = frames
+        return frames
+
+
+def preload(*loaders) -> Future:
+    # 在背景執行緒依序呼叫 loaders，例如開場動畫播放時先載入之後才用得到的圖
+    global _loader
+    if _loader is None:
+        _loader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="preload")
+    return _loader.submit(lambda: [loader() for loader in loaders])
@@ -0,0 +1,40 @@
+import json
+from dataclasses import dataclass
+
+# 規則裡的萬用字元：任何物件 / 任何狀態
+ANY = "*"
+
+
+@dataclass(frozen=True)
+class Rule:
+    actions: tuple = ()
+    message: str = ""
+    empty: str = ""
+
+
+class RuleTable:
+    # 互動規則表：以 (手上物品 id, 物件 id, 狀態) 為 key 的 dict，
+    # 查詢最多三次 dict 存取，不會隨規則數量變慢
+    def __init__(self, specs: list[dict]):
+        self.table: dict[tuple, Rule] = {}
+        for spec in specs:
+            key = (spec.get("item"), spec["object"], spec.get("state", ANY))
+            if key in self.table:
+                raise ValueError(f"重複的互動規則：{key}")
+            actions = tuple((a[0], *a[1:]) for a in spec.get("do", ()))
+            self.table[key] = Rule(actions, spec.get("message", ""), spec.get("empty", ""))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f)["rules"])
+
+    def actions(self):
+        return {action[0] for rule in self.table.values() for action in rule.actions}
+
+    def lookup(self, item_id, object_id, state) -> Rule | None:
+        table = self.table
+        rule = table.get((item_id, object_id, state)) or table.get((item_id, object_id, ANY))
+        if rule is None and item_id is not None:
+            rule = table.get((item_id, ANY, ANY))
+        return rule
@@ -0,0 +1,56 @@
+import json
+import os
+import tempfile
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# 存檔只記和關卡定義不同的部分（見 Game.snapshot），以精簡的 JSON 寫成 UTF-8
+VERSION = 1
+
+
+def encode(snapshot: dict) -> bytes:
+    data = {"version": VERSION, **snapshot}
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def decode(data: bytes) -> dict:
+    snapshot = json.loads(data)
+    if snapshot.get("version") != VERSION:
+        raise ValueError(f"不支援的存檔版本：{snapshot.get('version')}")
+    # JSON 的 key 一定是字串，房間編號轉回 int
+    snapshot["rooms"] = {int(room): state for room, state in snapshot["rooms"].items()}
+    return snapshot
+
+
+def save(path, snapshot: dict):
+    # 先寫暫存檔再換名，寫到一半當掉也不會弄壞舊的存檔；
+    # 暫存檔每次用不同的名字，兩邊同時存檔也不會寫到同一個暫存檔
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(os.path.abspath(path)),
+                                     prefix=os.path.basename(path) + ".", suffix=".tmp", delete=False) as f:
+        f.write(encode(snapshot))
+    try:
+        os.replace(f.name, path)
+    except OSError:
+        os.remove(f.name)
+        raise
+
+
+def load(path) -> dict:
+    with open(path, "rb") as f:
+        return decode(f.read())
+
+
+class Autosaver:
+    # 在背景執行緒寫檔，主迴圈只負責取快照，不會卡住畫面
+    def __init__(self, path):
+        self.path = path
+        self.executor: ThreadPoolExecutor | None = None
+        self.last: Future | None = None
+
+    def save(self, snapshot: dict):
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="autosave")
+        self.last = self.executor.submit(save, self.path, snapshot)
+
+    def flush(self):
+        if self.last:
+            self.last.result()
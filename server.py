@@ -0,0 +1,244 @@
+import argparse
+import asyncio
+import base64
+import itertools
+import json
+import sys
+import traceback
+import zlib
+
+import pygame
+
+import level
+import main
+import replay
+
+# 一個行程裡同時跑很多局。協定是每行一個 JSON：
+# client -> server
+#   {"op": "new", "seed": 1}                        開新的一局，回 {"op": "created", "session": id}
+#   {"op": "input", "session": id, "click": [x, y]} 輸入，格式同通關腳本（move / click / key）
+#   {"op": "attach", "session": id}                 開始收畫面
+#   {"op": "detach", "session": id}                 不再收畫面
+#   {"op": "close", "session": id}                  結束這一局
+# server -> client
+#   {"op": "state", "session": id, "tick": n, "diff": {...}}   狀態有變時送出變動的欄位（同 Game.snapshot）
+#   {"op": "frame", "session": id, "rects": [[x, y, w, h, data], ...]}
+#       有 viewer 時才算繪；data 是該區域 RGB 像素經 zlib 壓縮後的 base64
+#   {"op": "closed", "session": id}
+#   {"op": "error", "message": "..."}
+# 寫入緩衝超過這個大小時先跳過畫面，只送狀態
+MAX_PENDING_BYTES = 1 << 20
+
+
+class Session:
+    # 一局遊戲；沒有 viewer 時不算繪，也不佔畫面大小的記憶體
+    def __init__(self, session_id, game, owner):
+        self.id = session_id
+        self.game = game
+        self.owner = owner
+        self.inputs: list[pygame.event.Event] = []
+        self.viewers: set = set()
+        self.surface: pygame.Surface | None = None
+        self.state: dict = {}
+
+    def diff(self) -> dict:
+        state = self.game.snapshot()
+        del state["ticks"]
+        changed = {key: value for key, value in state.items() if self.state.get(key) != value}
+        self.state = state
+        return changed
+
+    def attach(self, writer):
+        if self.surface is None:
+            self.surface = pygame.Surface((main.WIDTH, main.HEIGHT))
+        self.viewers.add(writer)
+        self.game.dirty.add_full()
+
+    def detach(self, writer):
+        self.viewers.discard(writer)
+        if not self.viewers:
+            self.surface = None
+
+
+class Server:
+    def __init__(self):
+        self.sessions: dict[int, Session] = {}
+        self.ids = itertools.count(1)
+
+    def create(self, owner, seed=None) -> Session:
+        # 不預載相鄰的房間：幾百局各自預載會多出幾百條執行緒，還會和 asyncio 迴圈搶著建 Surface
+        session = Session(next(self.ids), main.new_game(seed, prefetch=False), owner)
+        session.game.on_quit = lambda: self.close(session.id)
+        self.sessions[session.id] = session
+        return session
+
+    def close(self, session_id):
+        session = self.sessions.pop(session_id, None)
+        if session:
+            session.game.room_cache.close()
+            send(session.owner, {"op": "closed", "session": session_id})
+
+    def handle(self, writer, msg):
+        if not isinstance(msg, dict):
+            send(writer, {"op": "error", "message": "訊息要是 JSON 物件"})
+            return
+        op = msg.get("op")
+        if op not in OPS:
+            send(writer, {"op": "error", "message": f"未知的指令：{op}"})
+            return
+        if op == "new":
+            seed = msg.get("seed")
+            if seed is not None and not is_int(seed):
+                send(writer, {"op": "error", "message": f"seed 要是整數：{seed}"})
+                return
+            session = self.create(writer, seed)
+            send(writer, {"op": "created", "session": session.id})
+            return
+        session_id = msg.get("session")
+        session = self.sessions.get(session_id) if is_int(session_id) else None
+        if session is None:
+            send(writer, {"op": "error", "message": f"沒有這一局：{session_id}"})
+            return
+        if op == "input":
+            error = check_input(msg)
+            if error:
+                send(writer, {"op": "error", "session": session.id, "message": error})
+                return
+            session.inputs.extend(replay.step_events(msg))
+        elif op == "attach":
+            session.attach(writer)
+        elif op == "detach":
+            session.detach(writer)
+        elif op == "close":
+            self.close(session.id)
+
+    def disconnect(self, writer):
+        for session in list(self.sessions.values()):
+            session.detach(writer)
+            if session.owner is writer:
+                del self.sessions[session.id]
+                session.game.room_cache.close()
+
+    # 所有局共用一個 tick；輸入在 tick 開始時才套用，和單機版的順序一樣。
+    # 某一局出錯時只關掉那一局，其他局照常進行
+    def tick(self):
+        for session in list(self.sessions.values()):
+            try:
+                self.tick_session(session)
+            except Exception as e:
+                traceback.print_exc(file=sys.stderr)
+                send(session.owner, {"op": "error", "session": session.id, "message": f"這一局出錯了：{e!r}"})
+                self.close(session.id)
+
+    def tick_session(self, session):
+        game = session.game
+        inputs, session.inputs = session.inputs, []
+        for event in inputs:
+            main.handle_event(game, event)
+        if session.id not in self.sessions:
+            return
+        main.tick(game)
+        changed = session.diff()
+        if changed:
+            send(session.owner, {"op": "state", "session": session.id, "tick": game.ticks, "diff": changed})
+        if session.viewers:
+            self.send_frame(session)
+
+    def send_frame(self, session):
+        game = session.game
+        game.player.interpolate(1.0)
+        rects = main.render(game, session.surface)
+        if not rects:
+            return
+        data = [[*rect, encode_pixels(session.surface, rect)] for rect in rects]
+        for writer in session.viewers:
+            if writer.transport.get_write_buffer_size() > MAX_PENDING_BYTES:
+                game.dirty.add_full()
+                continue
+            send(writer, {"op": "frame", "session": session.id, "rects": data})
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        step = main.TICK_MS / 1000
+        next_tick = loop.time()
+        while True:
+            # 落後太多時丟掉多的 tick，和 main() 的 MAX_TICKS_PER_FRAME 一樣
+            for _ in range(main.MAX_TICKS_PER_FRAME):
+                if loop.time() < next_tick:
+                    break
+                self.tick()
+                next_tick += step
+            else:
+                next_tick = loop.time() + step
+            await asyncio.sleep(max(0.0, next_tick - loop.time()))
+
+    async def serve(self, reader, writer):
+        try:
+            while line := await reader.readline():
+                try:
+                    msg = json.loads(line)
+                except ValueError:
+                    send(writer, {"op": "error", "message": "不是 JSON"})
+                    continue
+                self.handle(writer, msg)
+        finally:
+            self.disconnect(writer)
+            writer.close()
+
+
+OPS = {"new", "input", "attach", "detach", "close"}
+
+
+def is_int(value) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+# 檢查 input 的內容，格式不對時回傳錯誤訊息
+def check_input(msg) -> str | None:
+    for name in ("move", "click"):
+        if name in msg:
+            pos = msg[name]
+            if not (isinstance(pos, list) and len(pos) == 2 and all(is_int(v) for v in pos)):
+                return f"{name} 要是兩個整數 [x, y]：{pos}"
+    if "key" in msg:
+        key = msg["key"]
+        if not isinstance(key, str):
+            return f"key 要是按鍵名稱：{key}"
+        try:
+            pygame.key.key_code(key)
+        except ValueError:
+            return f"未知的按鍵：{key}"
+    return None
+
+
+def encode_pixels(surf, rect) -> str:
+    pixels = pygame.image.tobytes(surf.subsurface(rect), "RGB")
+    return base64.b64encode(zlib.compress(pixels, 1)).decode("ascii")
+
+
+def send(writer, msg):
+    if not writer.is_closing():
+        writer.write(json.dumps(msg, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n")
+
+
+async def start(host="127.0.0.1", port=8765, unix=None):
+    server = Server()
+    if unix:
+        listener = await asyncio.start_unix_server(server.serve, unix)
+    else:
+        listener = await asyncio.start_server(server.serve, host, port)
+    try:
+        async with listener:
+            await server.run()
+    finally:
+        level.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="多人 server 模式：一個行程同時跑很多局")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="改用 unix socket")
+    args = parser.parse_args()
+    main.init(headless=True)
+    asyncio.run(start(args.host, args.port, args.unix))
@@ -0,0 +1,257 @@
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from collections import defaultdict, deque
+from multiprocessing import Pool
+
+import pygame
+
+import main
+
+# 用遊戲本身的邏輯（Game.interact、Game.combine、CodePanel）對關卡做廣度優先搜尋。
+# 狀態就是存檔快照（Game.snapshot）裡和過關有關的部分，展開時把快照 restore 回
+# 同一個 Game 再做一個動作，不必每個狀態都重建 Game。
+# 一層的狀態數超過這個數量才分給 process pool，太少時搬資料比展開還慢
+PARALLEL_THRESHOLD = 256
+CHUNK = 64
+
+_game: main.Game | None = None
+_codes: list[str] = []
+
+
+def state_key(snapshot: dict) -> str:
+    # 訊息、人物位置、手上物品不影響能不能過關；物品欄順序也不影響
+    return json.dumps([snapshot["room"], snapshot["rooms"], sorted(snapshot["inventory"]),
+                       snapshot["room_solve"], snapshot["win"]], sort_keys=True, ensure_ascii=False)
+
+
+def code_candidates(level) -> list[str]:
+    # 密碼只能從遊戲裡看得到的文字找：物品說明、規則訊息、房間訊息（3-1-4 當成 314）
+    texts = [spec.get("desc", "") for spec in level.items.values()]
+    texts += [rule.message for rule in level.rules.table.values()]
+    texts += [room["message"] for room in level.rooms.values()]
+    codes = {re.sub(r"\D", "", m) for text in texts for m in re.findall(r"\d(?:[-\s]?\d)+", text)}
+    return sorted(codes)
+
+
+def _init_worker(level_path):
+    global _game, _codes
+    main.LEVEL_PATH = level_path
+    main.init(headless=True)
+    _game = main.new_game(seed=0)
+    _codes = code_candidates(_game.level)
+
+
+def _settle(game):
+    # 動作做完後關掉便條紙、密碼面板，回到可以操作的狀態
+    game.show_note_image = False
+    game.code_panel = None
+    game.player.visible = True
+    game.held_item = None
+
+
+def _child(game, action, parent):
+    _settle(game)
+    snapshot = game.snapshot()
+    key = state_key(snapshot)
+    return (action, snapshot, key) if key != parent else None
+
+
+def expand(snapshot: dict) -> list[tuple]:
+    game = _game
+    parent = state_key(snapshot)
+    children = []
+
+    def attempt(action, do):
+        game.restore(snapshot)
+        do()
+        child = _child(game, action, parent)
+        if child:
+            children.append(child)
+
+    game.restore(snapshot)
+    visible = [obj.id for obj in game.objects if obj.visible]
+    coded = {obj.id for obj in game.objects if obj.code}
+    items = list(snapshot["inventory"])
+
+    def obj_by_id(obj_id):
+        return next(obj for obj in game.objects if obj.id == obj_id)
+
+    for obj_id in visible:
+        attempt(("click", obj_id), lambda: game.interact(None, obj_by_id(obj_id)))
+        if obj_id in coded:
+            for code in _codes:
+                def enter(code=code, obj_id=obj_id):
+                    game.interact(None, obj_by_id(obj_id))
+                    if game.code_panel:
+                        game.code_panel.buffer = code
+                        game.code_panel.submit(game)
+                attempt(("code", obj_id, code), enter)
+        for key in items:
+            def use(key=key, obj_id=obj_id):
+                game.interact(game.inventory.items[key], obj_by_id(obj_id))
+            attempt(("use", key, obj_id), use)
+    for recipe in game.recipes.available(items):
+        inputs = sorted(recipe.inputs)
+        def combine(inputs=inputs):
+            game.combine([game.inventory.items[key] for key in inputs])
+        attempt(("combine", *inputs), combine)
+    attempt(("key", "r"), lambda: game.handle_key_down(pygame.K_r))
+    return children
+
+
+def _expand_chunk(snapshots):
+    return [expand(s) for s in snapshots]
+
+
+def describe(level, action) -> str:
+    names = {o["id"]: o["name"] for room in level.rooms.values() for o in room["objects"]}
+    item = lambda key: level.items[key]["name"] if key in level.items else key
+    kind, *args = action
+    if kind == "click":
+        return f"點「{names[args[0]]}」"
+    if kind == "code":
+        return f"在「{names[args[0]]}」輸入密碼 {args[1]}"
+    if kind == "use":
+        return f"對「{names[args[1]]}」使用「{item(args[0])}」"
+    if kind == "combine":
+        return f"組合{main.join_names(f'「{item(key)}」' for key in args)}"
+    return f"按 {args[0].upper()}"
+
+
+def solve(level_path=main.LEVEL_PATH, workers=None, max_states=1_000_000):
+    _init_worker(level_path)
+    game = _game
+    start = game.snapshot()
+    start["intro"] = [True, "done"]
+    start_key = state_key(start)
+    parents: dict[str, tuple | None] = {start_key: None}
+    states: dict[str, dict] = {start_key: start}
+    reverse: dict[str, set] = defaultdict(set)
+    frontier = [start]
+    pool = None
+    try:
+        while frontier and len(states) < max_states:
+            if len(frontier) >= PARALLEL_THRESHOLD and workers != 1:
+                if pool is None:
+                    pool = Pool(workers, initializer=_init_worker, initargs=(level_path,))
+                chunks = [frontier[i:i + CHUNK] for i in range(0, len(frontier), CHUNK)]
+                results = [r for chunk in pool.map(_expand_chunk, chunks) for r in chunk]
+            else:
+                results = [expand(s) for s in frontier]
+            next_frontier = []
+            for snapshot, children in zip(frontier, results):
+                key = state_key(snapshot)
+                for action, child, child_key in children:
+                    reverse[child_key].add(key)
+                    if child_key not in parents:
+                        parents[child_key] = (key, action)
+                        states[child_key] = child
+                        next_frontier.append(child)
+            frontier = next_frontier
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+    return report(game.level, states, parents, reverse, truncated=bool(frontier))
+
+
+def path_to(level, parents, key) -> list[str]:
+    steps = []
+    while parents[key] is not None:
+        key, action = parents[key]
+        steps.append(describe(level, action))
+    return steps[::-1]
+
+
+def report(level, states, parents, reverse, truncated=False) -> dict:
+    # states 依 BFS 順序加入，第一個符合條件的就是最短路徑
+    wins = [key for key, s in states.items() if s["win"]]
+    # 從過關狀態倒著走，走不到的狀態就是死路
+    can_win = set(wins)
+    queue = deque(wins)
+    while queue:
+        for parent in reverse[queue.popleft()]:
+            if parent not in can_win:
+                can_win.add(parent)
+                queue.append(parent)
+
+    # 每個物品原本在哪個房間：物件裡裝的，或是點物件時給的
+    item_room = {}
+    for room_id, room in level.rooms.items():
+        ids = {o["id"] for o in room["objects"]}
+        for o in room["objects"]:
+            for item in o.get("contains", []):
+                item_room.setdefault(item, room_id)
+        for (_, object_id, _), rule in level.rules.table.items():
+            if object_id in ids:
+                for name, *args in rule.actions:
+                    if name == "give":
+                        item_room.setdefault(args[0], room_id)
+
+    obtained = {key for s in states.values() for key in s["inventory"]}
+    unlocked = {(room, obj) for s in states.values() for room, delta in s["rooms"].items()
+                for obj, d in delta.items() if d.get("locked") is False}
+    rooms = {}
+    for room_id, room in level.rooms.items():
+        reached = next((key for key, s in states.items() if s["room"] == room_id), None)
+        dead = [key for key, s in states.items() if s["room"] == room_id and key not in can_win]
+        rooms[room_id] = {
+            "reachable": reached is not None,
+            "path": path_to(level, parents, reached) if reached else None,
+            "dead_ends": len(dead),
+            "dead_end_path": path_to(level, parents, dead[0]) if dead else None,
+            "unreachable_items": sorted(i for i, r in item_room.items() if r == room_id and i not in obtained),
+            "never_unlocked": sorted(o["id"] for o in room["objects"]
+                                     if o.get("locked") and (room_id, o["id"]) not in unlocked),
+        }
+    return {
+        "states": len(states),
+        "truncated": truncated,
+        "solvable": bool(wins),
+        "solution": path_to(level, parents, wins[0]) if wins else None,
+        "unreachable_items": sorted(set(level.items) - obtained),
+        "rooms": rooms,
+    }
+
+
+def print_report(result):
+    print(f"搜尋了 {result['states']} 個狀態" + ("（達到上限，結果可能不完整）" if result["truncated"] else ""))
+    if result["solvable"]:
+        print(f"最短解法 {len(result['solution'])} 步：")
+        for i, step in enumerate(result["solution"], 1):
+            print(f"  {i}. {step}")
+    else:
+        print("無法過關！")
+    for room_id, room in result["rooms"].items():
+        print(f"房間 {room_id}：" + ("可以到達" if room["reachable"] else "無法到達"))
+        if room["reachable"] and room["path"]:
+            print(f"  最短 {len(room['path'])} 步到達")
+        if room["dead_ends"]:
+            print(f"  死路 {room['dead_ends']} 個狀態，最近的一個：{' → '.join(room['dead_end_path']) or '(起點)'}")
+        if room["unreachable_items"]:
+            print(f"  拿不到的物品：{', '.join(room['unreachable_items'])}")
+        if room["never_unlocked"]:
+            print(f"  打不開的物件：{', '.join(room['never_unlocked'])}")
+    if result["unreachable_items"]:
+        print(f"整個關卡拿不到的物品：{', '.join(result['unreachable_items'])}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="用 BFS 確認關卡可以過關，列出死路與拿不到的物品")
+    parser.add_argument("level", nargs="?", default=main.LEVEL_PATH)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--max-states", type=int, default=1_000_000)
+    parser.add_argument("--json", help="把結果寫成 JSON 檔")
+    args = parser.parse_args()
+    t0 = time.perf_counter()
+    result = solve(args.level, args.workers, args.max_states)
+    print_report(result)
+    print(f"耗時 {time.perf_counter() - t0:.2f} 秒")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    sys.exit(0 if result["solvable"] else 1)
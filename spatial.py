@@ -0,0 +1,47 @@
+from collections import defaultdict
+
+import pygame
+
+
+class SpatialHash:
+    # 均勻格子索引：每個看得到的物件登記在它的矩形蓋到的每一格，
+    # 查詢時只要看那幾格；物件新增、移動或隱藏時標記 dirty，下次查詢前重建
+    def __init__(self, cell=64):
+        self.cell = cell
+        self.cells: dict[tuple, list] = defaultdict(list)
+        self.dirty = True
+
+    def _keys(self, rect):
+        cell = self.cell
+        for cx in range(rect.left // cell, (rect.right - 1) // cell + 1):
+            for cy in range(rect.top // cell, (rect.bottom - 1) // cell + 1):
+                yield cx, cy
+
+    def rebuild(self, objects):
+        self.cells.clear()
+        # z 是畫的順序，越後面畫的越上層
+        for z, obj in enumerate(objects):
+            if obj.visible:
+                for key in self._keys(obj.rect):
+                    self.cells[key].append((z, obj))
+        self.dirty = False
+
+    def at(self, pos):
+        # 找出蓋住這個點、最上層的物件
+        entries = self.cells.get((int(pos[0]) // self.cell, int(pos[1]) // self.cell))
+        if not entries:
+            return None
+        for z, obj in reversed(entries):
+            if obj.rect.collidepoint(pos):
+                return obj
+        return None
+
+    def query_rect(self, rect):
+        # 和 rect 相交的物件，依 z 由下到上排序
+        rect = pygame.Rect(rect)
+        found = {}
+        for key in self._keys(rect):
+            for z, obj in self.cells.get(key, ()):
+                if z not in found and obj.rect.colliderect(rect):
+                    found[z] = obj
+        return [found[z] for z in sorted(found)]
@@ -0,0 +1,100 @@
+from enum import IntEnum
+
+import pygame
+
+
+class Direction(IntEnum):
+    DOWN = 0
+    RIGHT = 1
+    UP = 2
+    LEFT = 3
+
+
+class AnimatedSprite:
+    # 可以共用的動畫元件：frames[狀態][方向] 是一組圖片，
+    # 依經過的秒數決定顯示第幾張，取圖只是兩次 list 索引
+    __slots__ = ("frames", "fps", "loops", "state", "direction", "frame", "elapsed", "done")
+
+    def __init__(self, frames, fps=9.0, loops=None, state=0, direction=Direction.DOWN):
+        self.frames = frames
+        self.fps = fps
+        # 每個狀態要不要重複播放；不重複的播完停在最後一張
+        self.loops = loops or [True] * len(frames)
+        self.state = state
+        self.direction = direction
+        self.frame = 0
+        self.elapsed = 0.0
+        self.done = False
+
+    def play(self, state, restart=False):
+        if state == self.state and not restart:
+            return
+        self.state = state
+        self.frame = 0
+        self.elapsed = 0.0
+        self.done = False
+
+    def face(self, direction):
+        self.direction = direction
+
+    def finish(self):
+        self.frame = len(self.frames[self.state][self.direction]) - 1
+        self.done = True
+
+    # 回傳顯示的圖片是否改變
+    def update(self, dt) -> bool:
+        if self.done:
+            return False
+        self.elapsed += dt
+        count = len(self.frames[self.state][self.direction])
+        frame = int(self.elapsed * self.fps)
+        if frame >= count:
+            if self.loops[self.state]:
+                frame %= count
+            else:
+                frame = count - 1
+                self.done = True
+        changed = frame != self.frame
+        self.frame = frame
+        return changed
+
+    @property
+    def image(self) -> pygame.Surface:
+        return self.frames[self.state][self.direction][self.frame]
+
+
+# 物件的開關動畫：狀態 0 是關著（一張圖），1 是打開的過程（播完停在打開）
+CLOSED, OPENING = 0, 1
+OPEN_FRAMES = 6
+_opening: dict[tuple, list] = {}
+
+
+def opening_frames(kind, size, color) -> list:
+    # 依物件的尺寸與顏色畫出開門 / 拉開抽屜的幾張圖，同樣的物件共用
+    key = (kind, tuple(size), tuple(color))
+    frames = _opening.get(key)
+    if frames is not None:
+        return frames
+    w, h = size
+    shadow = tuple(c // 3 for c in color)
+    images = []
+    for i in range(OPEN_FRAMES + 1):
+        t = i / OPEN_FRAMES
+        img = pygame.Surface(size)
+        img.fill(color)
+        if i:
+            img.fill((20, 20, 25), (2, 2, w - 4, h - 4))
+            if kind == "door":
+                # 門板往左邊的門軸轉開，看起來越來越窄
+                panel = pygame.Rect(0, 0, max(4, round(w * (1 - 0.8 * t))), h)
+                img.fill(color, panel)
+                pygame.draw.rect(img, shadow, panel, 2)
+            else:
+                # 抽屜往下拉出來，上面露出裡面的暗處
+                panel = pygame.Rect(0, round(h * 0.6 * t), w, h)
+                img.fill(color, panel)
+                pygame.draw.line(img, shadow, panel.topleft, panel.topright, 3)
+        images.append(img)
+    frames = [[[images[0]]], [images[1:]]]
+    _opening[key] = frames
+    return frames
@@ -0,0 +1,75 @@
+import pygame
+
+import profiler
+
+# 共用的半透明圖層，依 (尺寸, 顏色) 只建立一次
+_overlays: dict[tuple, pygame.Surface] = {}
+# 純色的物件圖片，同尺寸同顏色的物件共用一張（不含 alpha，可以直接貼）
+_solids: dict[tuple, pygame.Surface] = {}
+
+
+def get_overlay(size, color) -> pygame.Surface:
+    key = (tuple(size), tuple(color))
+    overlay = _overlays.get(key)
+    if overlay is None:
+        overlay = pygame.Surface(key[0], pygame.SRCALPHA)
+        overlay.fill(key[1])
+        _overlays[key] = overlay
+    return overlay
+
+
+def get_solid(size, color) -> pygame.Surface:
+    key = (tuple(size), tuple(color))
+    surf = _solids.get(key)
+    if surf is None:
+        surf = pygame.Surface(key[0])
+        surf.fill(key[1])
+        _solids[key] = surf
+    return surf
+
+
+# 光圈貼圖，同半徑同暗度的 Spotlight 共用
+_spotlights: dict[tuple, pygame.Surface] = {}
+
+
+def get_spotlight_sprite(radius, darkness) -> pygame.Surface:
+    key = (radius, darkness)
+    sprite = _spotlights.get(key)
+    if sprite is None:
+        sprite = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
+        sprite.fill((0, 0, 0, darkness))
+        pygame.draw.circle(sprite, (0, 0, 0, 0), (radius, radius), radius)
+        _spotlights[key] = sprite
+    return sprite
+
+
+class Spotlight:
+    # 暗房遮罩：遮罩與光圈貼圖都只建立一次，
+    # 每幀只把上一個光圈補回黑色，再把光圈貼到新的位置。
+    # 遮罩等到第一次畫的時候才建立，沒有人在看的遊戲不必佔這塊記憶體
+    def __init__(self, size, radius, darkness=200):
+        self.size = size
+        self.radius = radius
+        self.darkness = darkness
+        self.mask: pygame.Surface | None = None
+        self.sprite = get_spotlight_sprite(radius, darkness)
+        self.hole: pygame.Rect | None = None
+
+    def move(self, pos):
+        if self.mask is None:
+            self.mask = pygame.Surface(self.size, pygame.SRCALPHA)
+            self.mask.fill((0, 0, 0, self.darkness))
+            self.hole = None
+        rect = self.sprite.get_rect(center=(int(pos[0]), int(pos[1])))
+        if rect == self.hole:
+            return
+        if self.hole:
+            self.mask.fill((0, 0, 0, self.darkness), self.hole)
+        # 取每個通道的最小值，光圈內的 alpha 0 會把遮罩挖空
+        self.mask.blit(self.sprite, rect, special_flags=pygame.BLEND_RGBA_MIN)
+        self.hole = rect
+
+    def draw(self, surf, pos):
+        self.move(pos)
+        surf.blit(self.mask, (0, 0))
+        profiler.count("blits")
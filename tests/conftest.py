@@ -0,0 +1,18 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+# 測試都在沒有視窗的環境跑；關卡、圖片用相對路徑，所以切到專案根目錄
+@pytest.fixture(scope="session", autouse=True)
+def headless_game():
+    import main
+    cwd = os.getcwd()
+    os.chdir(ROOT)
+    main.init(headless=True)
+    yield
+    os.chdir(cwd)
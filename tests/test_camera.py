@@ -0,0 +1,69 @@
+import json
+
+import pygame
+import pytest
+
+import main
+
+
+@pytest.fixture
+def game(tmp_path, monkeypatch):
+    # 把第一個房間放大成 2000x1200，右下角放一個物件
+    with open(main.LEVEL_PATH, encoding="utf-8") as f:
+        data = json.load(f)
+    room = next(r for r in data["rooms"] if r["id"] == data["start_room"])
+    room["size"] = [2000, 1200]
+    room["objects"].append({"id": "far_box", "name": "遠處的箱子", "rect": [1800, 1000, 80, 60],
+                            "color": [200, 60, 60], "hover_color": [255, 90, 90]})
+    path = tmp_path / "large.json"
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+    monkeypatch.setattr(main, "LEVEL_PATH", str(path))
+    game = main.new_game(0)
+    game.end_intro()
+    return game
+
+
+def far_box(game):
+    return next(obj for obj in game.objects if obj.id == "far_box")
+
+
+def move_player(game, pos):
+    game.player.x, game.player.y = game.player.render_x, game.player.render_y = pos
+    game.update_camera()
+
+
+def test_camera_views_only_the_play_area(game):
+    assert game.camera.rect.size == main.PLAY_RECT.size
+    move_player(game, (1990, 1190))
+    assert game.camera.rect.bottomright == (2000, 1200)
+    box = far_box(game)
+    assert main.PLAY_RECT.contains(game.camera.to_screen_rect(box.rect))
+    assert game.object_at_screen(game.camera.to_screen(box.rect.center)) is box
+
+
+def test_objects_under_the_hud_are_culled_and_not_clickable(game):
+    move_player(game, (1800, 700))
+    box = far_box(game)
+    screen_pos = game.camera.to_screen(box.rect.center)
+    assert main.HUD_RECT.collidepoint(screen_pos)
+    room = game.rooms[game.current_room]
+    room["index"].rebuild(game.objects)
+    assert box not in room["index"].query_rect(game.camera.rect)
+    assert game.object_at_screen(screen_pos) is None
+    main.handle_event(game, pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=screen_pos, button=1))
+    assert game.player.target is None
+
+
+def test_scrolled_frame_matches_full_redraw(game):
+    surf = pygame.Surface((main.WIDTH, main.HEIGHT))
+    main.render(game, surf)
+    main.handle_event(game, pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=(900, 300), button=1))
+    for _ in range(120):
+        main.tick(game)
+        game.player.interpolate(1.0)
+        main.render(game, surf)
+    assert game.camera.rect.x > 0
+    drawn = surf.copy()
+    game.dirty.add_full()
+    main.render(game, surf)
+    assert pygame.image.tobytes(drawn, "RGB") == pygame.image.tobytes(surf, "RGB")
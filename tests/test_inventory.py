@@ -0,0 +1,47 @@
+import main
+from recipes import RecipeBook
+
+
+def test_add_refuses_items_past_capacity():
+    inventory = main.Inventory(capacity=2)
+    assert inventory.add(main.Item("a"))
+    assert inventory.add(main.Item("b"))
+    assert not inventory.add(main.Item("c"))
+    assert list(inventory.items) == ["a", "b"]
+    # 已經有的物品不算超過
+    assert inventory.add(main.Item("a"))
+
+
+def test_click_past_last_slot_is_ignored():
+    inventory = main.Inventory(capacity=2)
+    inventory.items = {k: main.Item(k) for k in "abc"}
+    rect = inventory.slot_rects[-1]
+    assert inventory.handle_click((rect.right + inventory.slot_pitch - rect.width // 2, rect.centery)) is None
+    assert inventory.handle_click(rect.center).name == "b"
+
+
+def test_full_inventory_leaves_object_in_place():
+    game = main.new_game(0)
+    game.end_intro()
+    for i in range(game.inventory.capacity):
+        game.inventory.add(main.Item(f"item{i}"))
+    magnifier = next(obj for obj in game.objects if obj.id == "magnifier")
+    assert game.interact(None, magnifier) == "物品欄已滿。"
+    assert magnifier.visible
+    assert "magnifier" not in game.inventory.items
+
+
+def test_combine_refuses_when_outputs_do_not_fit():
+    game = main.new_game(0)
+    game.recipes = RecipeBook([{"in": ["note", "magnifier"], "out": ["key", "axe", "decoded_note"]}])
+    inputs = [game.make_item("note"), game.make_item("magnifier")]
+    for item in inputs:
+        game.inventory.add(item)
+    for i in range(game.inventory.capacity - 2):
+        game.inventory.add(main.Item(f"item{i}"))
+    assert not game.combine(inputs)
+    assert game.message == "物品欄已滿。"
+    assert {"note", "magnifier"} <= game.inventory.items.keys()
+    game.inventory.remove(main.Item("item0"))
+    assert game.combine(inputs)
+    assert {"key", "axe", "decoded_note"} <= game.inventory.items.keys()
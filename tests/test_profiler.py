@@ -0,0 +1,20 @@
+import profiler
+
+
+def test_hiding_overlay_keeps_trace_running():
+    profiler.enable(trace=True)
+    try:
+        profiler.toggle_overlay()
+        assert profiler.show_overlay and profiler.enabled
+        profiler.toggle_overlay()
+        assert not profiler.show_overlay
+        assert profiler.enabled
+    finally:
+        profiler.disable()
+
+
+def test_overlay_alone_stops_sampling_when_hidden():
+    profiler.toggle_overlay()
+    assert profiler.enabled
+    profiler.toggle_overlay()
+    assert not profiler.enabled
@@ -0,0 +1,6 @@
+import recording
+
+
+def test_clicks_outside_the_screen_keep_their_sign():
+    events = [(0, recording.MOTION, 250, -20), (3, recording.CLICK, -5, 600, 1)]
+    assert recording.decode(recording.encode(7, events)) == (7, events)
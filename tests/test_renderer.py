@@ -0,0 +1,8 @@
+import pytest
+
+import renderer
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        renderer.create("bogus", (64, 64))
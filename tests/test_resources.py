@@ -0,0 +1,28 @@
+import pygame
+
+import resources
+
+
+def test_missing_font_is_not_cached(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(resources, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(resources, "CACHE_INDEX", str(tmp_path / "index.json"))
+    monkeypatch.setattr(resources, "_index", None)
+    monkeypatch.setattr(resources, "_font_paths", {})
+    font = tmp_path / "font.ttf"
+    font.write_bytes(b"")
+    found = {"path": None}
+    monkeypatch.setattr(pygame.font, "match_font", lambda name: found["path"])
+
+    # 同一次執行只查一次、只警告一次
+    assert resources.font_path("nosuchfont") is None
+    assert resources.font_path("nosuchfont") is None
+    assert capsys.readouterr().err.count("nosuchfont") == 1
+    # 重新啟動：從硬碟讀快取，仍然會警告，而且裝了字型之後找得到
+    monkeypatch.setattr(resources, "_index", None)
+    monkeypatch.setattr(resources, "_font_paths", {})
+    assert resources.font_path("nosuchfont") is None
+    assert capsys.readouterr().err.count("nosuchfont") == 1
+    found["path"] = str(font)
+    monkeypatch.setattr(resources, "_index", None)
+    monkeypatch.setattr(resources, "_font_paths", {})
+    assert resources.font_path("nosuchfont") == str(font)
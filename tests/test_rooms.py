@@ -0,0 +1,18 @@
+import main
+
+
+def test_evicting_a_room_stops_its_animations(monkeypatch):
+    monkeypatch.setattr(main, "ROOM_MEMORY_BUDGET", 0)
+    game = main.new_game(0)
+    game.end_intro()
+    door = next(obj for obj in game.objects if obj.id == "door")
+    game.interact(game.make_item("key"), door)
+    assert door in game.animating
+    game.interact(None, door)
+    assert game.current_room == 2 and 1 not in game.rooms
+    assert door not in game.animating
+    main.tick(game)
+    # 回到房間時，門是打開的
+    game.enter_room(1)
+    door = next(obj for obj in game.objects if obj.id == "door")
+    assert not door.locked
@@ -0,0 +1,56 @@
+import os
+import threading
+
+import pygame
+
+import main
+import savegame
+
+
+def press(game, key):
+    main.handle_host_key(game, pygame.event.Event(pygame.KEYDOWN, key=key, mod=0, unicode=""))
+
+
+def test_save_with_note_open_restores_visible_player(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "SAVE_PATH", str(tmp_path / "game.sav"))
+    game = main.new_game(0)
+    game.end_intro()
+    game.autosave = savegame.Autosaver(main.SAVE_PATH)
+    game.act_show_note(None, None)
+    game.act_hide_player(None, None)
+    press(game, pygame.K_F5)
+    press(game, pygame.K_F9)
+    assert not game.show_note_image
+    assert game.player.visible
+
+
+def test_concurrent_saves_do_not_collide(tmp_path):
+    path = str(tmp_path / "game.sav")
+    game = main.new_game(0)
+    snapshot = game.snapshot()
+    errors = []
+
+    def worker():
+        try:
+            for _ in range(50):
+                savegame.save(path, snapshot)
+        except OSError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+    assert savegame.load(path)["room"] == snapshot["room"]
+    assert os.listdir(tmp_path) == ["game.sav"]
+
+
+def test_replayed_save_keys_do_not_touch_the_save(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "SAVE_PATH", str(tmp_path / "game.sav"))
+    game = main.new_game(0)
+    game.end_intro()
+    for key in (pygame.K_F5, pygame.K_F9):
+        main.handle_event(game, pygame.event.Event(pygame.KEYDOWN, key=key, mod=0, unicode=""))
+    assert not os.path.exists(main.SAVE_PATH)
@@ -0,0 +1,84 @@
+import json
+import threading
+
+import main
+import server
+
+
+class FakeTransport:
+    def get_write_buffer_size(self):
+        return 0
+
+
+class FakeWriter:
+    # 收集 server 送出的訊息
+    def __init__(self):
+        self.transport = FakeTransport()
+        self.messages = []
+
+    def is_closing(self):
+        return False
+
+    def write(self, data):
+        self.messages.extend(json.loads(line) for line in data.splitlines())
+
+    def errors(self):
+        return [m for m in self.messages if m["op"] == "error"]
+
+
+def new_session(srv, writer, seed):
+    srv.handle(writer, {"op": "new", "seed": seed})
+    return writer.messages[-1]["session"]
+
+
+def test_bad_messages_are_rejected():
+    srv = server.Server()
+    writer = FakeWriter()
+    sid = new_session(srv, writer, 1)
+    bad = [
+        [1, 2],
+        "hello",
+        {"op": "nope"},
+        {"op": "new", "seed": [1]},
+        {"op": "input", "session": [sid]},
+        {"op": "input", "session": sid, "click": ["a", "b"]},
+        {"op": "input", "session": sid, "click": [1]},
+        {"op": "input", "session": sid, "move": {"x": 1}},
+        {"op": "input", "session": sid, "key": "no-such-key"},
+        {"op": "input", "session": sid, "key": 13},
+    ]
+    for msg in bad:
+        srv.handle(writer, msg)
+    assert len(writer.errors()) == len(bad)
+    assert srv.sessions[sid].inputs == []
+
+
+def test_failing_session_does_not_stop_others():
+    srv = server.Server()
+    writer = FakeWriter()
+    broken = new_session(srv, writer, 1)
+    healthy = new_session(srv, writer, 2)
+    srv.tick()
+    # 假設某一局在更新時出錯
+    def fail():
+        raise RuntimeError("boom")
+    srv.sessions[broken].game.update = fail
+    srv.handle(writer, {"op": "input", "session": healthy, "click": [600, 200]})
+    for _ in range(3):
+        srv.tick()
+    assert broken not in srv.sessions
+    assert healthy in srv.sessions
+    assert srv.sessions[healthy].game.ticks == 4
+    assert any(m["op"] == "closed" and m["session"] == broken for m in writer.messages)
+
+
+def test_sessions_do_not_start_loader_threads():
+    srv = server.Server()
+    writer = FakeWriter()
+    before = threading.active_count()
+    for seed in range(50):
+        new_session(srv, writer, seed)
+    srv.tick()
+    assert threading.active_count() == before
+    srv.disconnect(writer)
+    assert not srv.sessions
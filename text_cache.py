@@ -0,0 +1,76 @@
+from collections import OrderedDict
+
+import pygame
+
+import profiler
+
+# 文字算繪快取，超過上限時淘汰最久沒用到的
+MAX_ENTRIES = 512
+_cache: OrderedDict = OrderedDict()
+
+
+def render_text(font, text, color, antialias=True) -> pygame.Surface:
+    key = (text, font, color, antialias)
+    img = _cache.get(key)
+    if img is not None:
+        _cache.move_to_end(key)
+        return img
+    with profiler.scope("text.render"):
+        img = font.render(text, antialias, color)
+    profiler.count("text.renders")
+    _cache[key] = img
+    if len(_cache) > MAX_ENTRIES:
+        _cache.popitem(last=False)
+    return img
+
+
+def clear():
+    _cache.clear()
+
+
+class Typewriter:
+    # 逐字顯示的文字：每多一個字只算繪新的那個字，貼到目前的前進位置
+    def __init__(self, font, color, antialias=True):
+        self.font = font
+        self.color = color
+        self.antialias = antialias
+        self.text = ""
+        self.advance = 0
+        self.surface = pygame.Surface((1, font.get_linesize()), pygame.SRCALPHA)
+
+    def reset(self):
+        self.text = ""
+        self.advance = 0
+        self.surface.fill((0, 0, 0, 0))
+
+    def set_text(self, text):
+        if text == self.text:
+            return
+        if not text.startswith(self.text):
+            self.reset()
+        for ch in text[len(self.text):]:
+            glyph = render_text(self.font, ch, self.color, self.antialias)
+            self._ensure_width(self.advance + glyph.get_width(), glyph.get_height())
+            # 字與字不重疊，用 MAX 混合等於直接複製像素（含 alpha）
+            self.surface.blit(glyph, (self.advance, 0), special_flags=pygame.BLEND_RGBA_MAX)
+            self.advance += glyph.get_width()
+        self.text = text
+
+    def _ensure_width(self, width, height):
+        w, h = self.surface.get_size()
+        if width <= w and height <= h:
+            return
+        grown = pygame.Surface((max(width, w * 2), max(height, h)), pygame.SRCALPHA)
+        grown.blit(self.surface, (0, 0), special_flags=pygame.BLEND_RGBA_MAX)
+        self.surface = grown
+
+    def draw(self, surf, pos, center=False):
+        if not self.advance:
+            return
+        rect = pygame.Rect(0, 0, self.advance, self.surface.get_height())
+        if center:
+            rect.center = pos
+        else:
+            rect.topleft = pos
+        surf.blit(self.surface, rect, (0, 0, rect.width, rect.height))
+        profiler.count("blits")